@@ -0,0 +1,46 @@
+"""Запуск и остановка бота: хендлеры, БД, клиент hh.ru, пул обработки текстов и ночная рассылка.
+Точка входа -- main.py"""
+
+from aiogram.dispatcher import Dispatcher
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+import datetime
+
+from broadcast import parse_and_send
+from handlers import admin, other
+from db import Base, reference_data, subscriber_index
+from hh_parser import hh_client
+from SETTINGS import dp
+from utils.text_processing import text_pool
+
+
+scheduler = AsyncIOScheduler()
+
+today = datetime.datetime.today().strftime("%d.%m.%Y")
+today_night = datetime.datetime.strptime(f"{today} 23:30", "%d.%m.%Y %H:%M")
+
+# запуск в 23:30 каждый день
+trigger = IntervalTrigger(days=1, start_date=today_night)
+
+
+def register_all_handlers(dp: Dispatcher):
+    admin.register_handlers_admin(dp)
+    other.register_handlers_other(dp)
+
+
+async def on_startup(_):
+    register_all_handlers(dp)
+    await Base.start()
+    await reference_data.load()
+    await subscriber_index.load()
+    await hh_client.start()
+    text_pool.start()
+    scheduler.start()
+    scheduler.add_job(func=parse_and_send, trigger=trigger, id=parse_and_send.__name__)
+
+
+async def on_shutdown(_):
+    await Base.shutdown()
+    await hh_client.close()
+    text_pool.close()
+    scheduler.shutdown()
@@ -0,0 +1,138 @@
+"""Проверка через EXPLAIN, что горячие запросы db.py используют индексы из migrations.py.
+
+Запросы берутся из тех же функций, что и в боте (vacancy_matches_query, unsent_vacancies_query,
+unresolved_reviews_query), и планируются в базе из SETTINGS.
+На маленьких таблицах полный просмотр дешевле любого индекса, поэтому по умолчанию
+полный просмотр запрещается (SET LOCAL enable_seqscan = off): так проверяется, что индекс
+к запросу вообще применим, а не то, что он выгоднее на текущем объёме данных.
+--real-costs оставляет планировщику обычные настройки. Если хотя бы один запрос
+идёт мимо своего индекса, скрипт завершается с кодом 1:
+    python -m benchmarks.explain_check
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from db import (
+    Base,
+    engine,
+    unresolved_reviews_query,
+    unsent_vacancies_query,
+    vacancy_matches_query,
+)
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) над запросом SQLAlchemy, с теми же параметрами, что и у запроса"""
+
+    inherit_cache = False
+
+    def __init__(self, query):
+        self.query = query
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(explain: Explain, compiler, **kwargs) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(explain.query, **kwargs)
+
+
+class QueryCheck(NamedTuple):
+    name: str
+    query: object
+    index_name: str  # индекс, который должен оказаться в плане
+
+
+QUERY_CHECKS = [
+    QueryCheck(
+        name="iter_vacancy_matches",
+        query=vacancy_matches_query([1, 2, 3]),
+        index_name="ix_users_tags",
+    ),
+    QueryCheck(
+        name="iter_unsent_vacancies",
+        query=unsent_vacancies_query(),
+        index_name="ix_vacancies_unsent",
+    ),
+    QueryCheck(
+        name="get_random_review",
+        query=unresolved_reviews_query(),
+        index_name="ix_reviews_unresolved",
+    ),
+]
+
+
+def find_index_names(plan: dict) -> set[str]:
+    """Все индексы, которые встречаются в узлах плана"""
+    index_names = {plan["Index Name"]} if "Index Name" in plan else set()
+
+    for subplan in plan.get("Plans", []):
+        index_names |= find_index_names(subplan)
+
+    return index_names
+
+
+async def explain(query, real_costs: bool) -> dict:
+    async with engine.connect() as conn:
+        if not real_costs:
+            await conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+        result = await conn.execute(Explain(query))
+        plan = result.scalar_one()
+        await conn.rollback()
+
+    # asyncpg отдаёт json как строку
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return plan[0]["Plan"]
+
+
+async def run_checks(real_costs: bool) -> list[str]:
+    await Base.start()
+    failures = []
+
+    try:
+        for check in QUERY_CHECKS:
+            index_names = find_index_names(await explain(check.query, real_costs))
+            used = check.index_name in index_names
+
+            print(
+                f"{'ok' if used else 'FAIL':<6}{check.name:<30}{check.index_name:<24}"
+                f"в плане: {', '.join(sorted(index_names)) or 'полный просмотр'}"
+            )
+            if not used:
+                failures.append(check.name)
+
+    finally:
+        await Base.shutdown()
+
+    return failures
+
+
+def main(args: argparse.Namespace) -> int:
+    failures = asyncio.run(run_checks(args.real_costs))
+
+    if failures:
+        print(f"\nМимо индексов: {', '.join(failures)}")
+        return 1
+
+    print("\nВсе запросы используют свои индексы")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--real-costs",
+        action="store_true",
+        help="не запрещать полный просмотр таблиц при планировании",
+    )
+
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,247 @@
+"""Локальная замена api.hh.ru для бенчмарков и отладки парсера без сети.
+
+Отдаёт /vacancies, /vacancies/{id} и /employers/{id} из записанных ответов в benchmarks/fixtures:
+выдача из total вакансий собирается из search_item.json, у каждой вакансии свой id
+и published_at (от новых к старым, по минуте между вакансиями, фильтруется по date_from/date_to),
+а работодатель берётся по кругу из employers.json.
+
+Запуск отдельным процессом: python -m benchmarks.fake_hh_api --port 8080 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import copy
+import datetime
+import json
+import random
+from collections import Counter
+from pathlib import Path
+
+from aiohttp import web
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(name: str):
+    with open(FIXTURES_DIR / name, encoding="utf-8") as file:
+        return json.load(file)
+
+
+class FakeHHAPI:
+    """Поддельный api.hh.ru:
+    - latency (+ случайный latency_jitter) секунд на каждый ответ
+    - с вероятностью error_rate отвечает 503, с вероятностью throttle_rate -- 429 с Retry-After
+    - в requests считает запросы по эндпоинтам (search, vacancy, employer),
+    в errors -- выданные 429 и 5xx
+    """
+
+    def __init__(
+        self,
+        total: int = 300,
+        latency: float = 0.05,
+        latency_jitter: float = 0.02,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        id_offset: int = None,
+        seed: int = None,
+    ):
+        self.total = total
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+        # каждый запуск -- новые id, иначе парсер отсеет вакансии как уже известные
+        self.id_offset = (
+            id_offset
+            if id_offset is not None
+            else self.random.randrange(10**9, 2 * 10**9 - total)
+        )
+
+        self.search_item: dict = load_fixture("search_item.json")
+        self.vacancy: dict = load_fixture("vacancy.json")
+        self.employers: dict = {
+            employer["id"]: employer for employer in load_fixture("employers.json")
+        }
+
+        # published_at самой свежей вакансии выдачи, дальше -- на минуту раньше каждая
+        self.newest_published_at = datetime.datetime.now(datetime.timezone.utc).replace(
+            microsecond=0
+        )
+
+        self.requests = Counter()
+        self.errors = Counter()
+        self.app = self.make_app()
+        self.runner: web.AppRunner = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults_middleware])
+        app.router.add_get("/vacancies", self.search_handler)
+        app.router.add_get("/vacancies/{id}", self.vacancy_handler)
+        app.router.add_get("/employers/{id}", self.employer_handler)
+
+        return app
+
+    @staticmethod
+    def endpoint(request: web.Request) -> str:
+        if request.path == "/vacancies":
+            return "search"
+        elif request.path.startswith("/vacancies/"):
+            return "vacancy"
+        return "employer"
+
+    @web.middleware
+    async def faults_middleware(self, request: web.Request, handler):
+        endpoint = self.endpoint(request)
+        self.requests[endpoint] += 1
+
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.latency_jitter))
+
+        chance = self.random.random()
+        if chance < self.throttle_rate:
+            self.errors[f"{endpoint}:429"] += 1
+            return web.json_response(
+                {"errors": [{"type": "too_many_requests"}]},
+                status=429,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        if chance < self.throttle_rate + self.error_rate:
+            self.errors[f"{endpoint}:503"] += 1
+            return web.json_response({"errors": [{"type": "unavailable"}]}, status=503)
+
+        return await handler(request)
+
+    def employer_id(self, index: int) -> str:
+        employer_ids = list(self.employers)
+        return employer_ids[index % len(employer_ids)]
+
+    def published_at(self, index: int) -> datetime.datetime:
+        return self.newest_published_at - datetime.timedelta(minutes=index)
+
+    def make_search_item(self, index: int) -> dict:
+        item = copy.deepcopy(self.search_item)
+        hh_id = str(self.id_offset + index)
+        employer: dict = self.employers[self.employer_id(index)]
+
+        item["id"] = hh_id
+        item["url"] = f"https://api.hh.ru/vacancies/{hh_id}?host=hh.ru"
+        item["alternate_url"] = f"https://hh.ru/vacancy/{hh_id}"
+        item["published_at"] = self.published_at(index).strftime("%Y-%m-%dT%H:%M:%S%z")
+        item["employer"].update(
+            id=employer["id"],
+            name=employer["name"],
+            url=f"https://api.hh.ru/employers/{employer['id']}",
+            alternate_url=employer["alternate_url"],
+        )
+
+        # в выдаче встречаются и вакансии без опыта, и без зарплаты
+        if index % 2:
+            item["experience"] = {"id": "noExperience", "name": "Нет опыта"}
+        if index % 5 == 0:
+            item["salary"] = None
+
+        return item
+
+    async def search_handler(self, request: web.Request) -> web.Response:
+        per_page = int(request.query.get("per_page", 20))
+        page = int(request.query.get("page", 0))
+
+        # как у hh.ru: обе границы включаются, выдача -- от новых к старым
+        date_from, date_to = request.query.get("date_from"), request.query.get(
+            "date_to"
+        )
+        indexes = [
+            index
+            for index in range(self.total)
+            if (
+                not date_from
+                or self.published_at(index)
+                >= datetime.datetime.fromisoformat(date_from)
+            )
+            and (
+                not date_to
+                or self.published_at(index) <= datetime.datetime.fromisoformat(date_to)
+            )
+        ]
+        pages = -(-len(indexes) // per_page)
+
+        first = page * per_page
+        items = [
+            self.make_search_item(index) for index in indexes[first : first + per_page]
+        ]
+
+        return web.json_response(
+            {
+                "items": items,
+                "found": len(indexes),
+                "pages": pages,
+                "per_page": per_page,
+                "page": page,
+            }
+        )
+
+    async def vacancy_handler(self, request: web.Request) -> web.Response:
+        hh_id = int(request.match_info["id"])
+        index = hh_id - self.id_offset
+
+        if not 0 <= index < self.total:
+            return web.json_response({"errors": [{"type": "not_found"}]}, status=404)
+
+        vacancy = dict(self.vacancy, id=str(hh_id))
+        return web.json_response(vacancy)
+
+    async def employer_handler(self, request: web.Request) -> web.Response:
+        employer: dict or None = self.employers.get(request.match_info["id"])
+
+        if not employer:
+            return web.json_response({"errors": [{"type": "not_found"}]}, status=404)
+
+        return web.json_response(employer)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запускает сервер и возвращает его base_url (port=0 -- любой свободный порт)"""
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def add_fake_api_arguments(parser: argparse.ArgumentParser):
+    """Аргументы FakeHHAPI, общие для самого сервера и бенчмарков"""
+    parser.add_argument("--total", type=int, default=300, help="вакансий в выдаче")
+    parser.add_argument("--latency", type=float, default=0.05, help="секунд")
+    parser.add_argument("--latency-jitter", type=float, default=0.02, help="секунд")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="доля 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="секунд")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная замена api.hh.ru")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_fake_api_arguments(parser)
+    args = parser.parse_args()
+
+    fake_api = FakeHHAPI(
+        total=args.total,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    web.run_app(fake_api.app, host=args.host, port=args.port)
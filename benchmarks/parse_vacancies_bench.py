@@ -0,0 +1,209 @@
+"""Сквозной бенчмарк hh_parser.parse_vacancies против FakeHHAPI (без api.hh.ru).
+
+Показывает пропускную способность (вакансий в секунду), p50/p99 задержки каждой стадии
+(description, employer_type, texts -- пачка чистки и разметки страницы, persist и HTTP-запросов по эндпоинтам) и число запросов к API.
+
+Парсер пишет в БД из SETTINGS, поэтому запускать только на отдельной (не боевой) базе,
+в которой заполнена таблица employers_types:
+    python -m benchmarks.parse_vacancies_bench --total 500 --latency 0.05 --throttle-rate 0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import statistics
+import time
+from collections import defaultdict
+
+from sqlalchemy import func, select
+
+import hh_parser
+from benchmarks.fake_hh_api import FakeHHAPI, add_fake_api_arguments
+from db import Base, Vacancy, async_session, get_employers_types
+from utils.hh_client import HHClient
+from utils.text_processing import text_pool
+
+# стадии конвейера, которые оборачиваются таймером: (объект, имя атрибута, название стадии)
+STAGES = [
+    (hh_parser, "add_description", "description"),
+    (hh_parser, "add_texts", "texts"),
+    (hh_parser, "add_employer_type", "employer_type"),
+    (hh_parser, "add_vacancies", "persist"),
+]
+
+
+class StageStats:
+    """Копит длительности вызовов по стадиям"""
+
+    def __init__(self):
+        self.durations: dict[str, list[float]] = defaultdict(list)
+
+    def timed(self, stage: str, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.durations[stage].append(time.perf_counter() - started)
+
+        return wrapper
+
+    @staticmethod
+    def percentile(durations: list[float], percent: int) -> float:
+        if len(durations) < 2:
+            return durations[0] if durations else 0.0
+        return statistics.quantiles(durations, n=100, method="inclusive")[percent - 1]
+
+    def rows(self) -> list[tuple[str, int, float, float]]:
+        return [
+            (
+                stage,
+                len(durations),
+                self.percentile(durations, 50),
+                self.percentile(durations, 99),
+            )
+            for stage, durations in sorted(self.durations.items())
+        ]
+
+
+@contextlib.contextmanager
+def instrumented(stats: StageStats, client: HHClient):
+    """Подменяет стадии конвейера и HHClient.get_json обёртками с таймером, на выходе возвращает как было"""
+    originals = [(owner, name, getattr(owner, name)) for owner, name, _ in STAGES]
+    for owner, name, stage in STAGES:
+        setattr(owner, name, stats.timed(stage, getattr(owner, name)))
+
+    get_json = client.get_json
+
+    async def timed_get_json(path: str, endpoint: str, params: dict = None):
+        return await stats.timed(f"http:{endpoint}", get_json)(path, endpoint, params)
+
+    client.get_json = timed_get_json
+
+    try:
+        yield stats
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+        client.get_json = get_json
+
+
+async def run_benchmark(
+    fake_api: FakeHHAPI, concurrency_limit: int, budget: float
+) -> dict:
+    base_url = await fake_api.start()
+    client = HHClient(
+        base_url, budgets={"search": budget, "vacancy": budget, "employer": budget}
+    )
+    stats = StageStats()
+
+    vacancies_before = await count_vacancies()
+    started = time.perf_counter()
+
+    try:
+        async with client:
+            with instrumented(stats, client):
+                new_hh_ids = await hh_parser.parse_vacancies(
+                    client=client, concurrency_limit=concurrency_limit
+                )
+    finally:
+        await fake_api.stop()
+
+    elapsed = time.perf_counter() - started
+
+    return {
+        "elapsed": elapsed,
+        "processed": fake_api.total,
+        "saved": await count_vacancies() - vacancies_before,
+        "new": len(new_hh_ids),
+        "requests": dict(fake_api.requests),
+        "errors": dict(fake_api.errors),
+        "stages": stats.rows(),
+        "text_cache": text_pool.cache.stats(),
+    }
+
+
+async def count_vacancies() -> int:
+    async with async_session() as session:
+        result = await session.execute(select(func.count(Vacancy.id)))
+        return result.scalar_one()
+
+
+def print_report(report: dict):
+    elapsed: float = report["elapsed"]
+
+    print(f"Время: {elapsed:.2f} с")
+    print(
+        f"Вакансий в выдаче: {report['processed']}, сохранено: {report['saved']} "
+        f"(новых по add_vacancies: {report['new']}), "
+        f"{report['processed'] / elapsed:.1f} вакансий/с"
+    )
+    print(
+        "Запросы к API: "
+        + ", ".join(f"{k}={v}" for k, v in sorted(report["requests"].items()))
+        + f" (всего {sum(report['requests'].values())})"
+    )
+    if report["errors"]:
+        print(
+            "Ошибки API: "
+            + ", ".join(f"{k}={v}" for k, v in sorted(report["errors"].items()))
+        )
+
+    text_cache: dict = report["text_cache"]
+    print(
+        f"Кэш текстов: {text_cache['hits']} попаданий, {text_cache['misses']} промахов "
+        f"({text_cache['hit_rate']:.0%}), записей: {text_cache['size']}"
+    )
+
+    print(f"\n{'стадия':<16}{'вызовов':>10}{'p50, мс':>12}{'p99, мс':>12}")
+    for stage, calls, p50, p99 in report["stages"]:
+        print(f"{stage:<16}{calls:>10}{p50 * 1000:>12.1f}{p99 * 1000:>12.1f}")
+
+
+async def main(args: argparse.Namespace):
+    await Base.start()
+    if args.processes:
+        text_pool.start()
+
+    try:
+        employers_types = await get_employers_types(reverse=True)
+        if not {"Консалтинг", "Инхаус"} <= set(employers_types):
+            raise SystemExit("В таблице employers_types нет Консалтинг/Инхаус")
+
+        fake_api = FakeHHAPI(
+            total=args.total,
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            retry_after=args.retry_after,
+            seed=args.seed,
+        )
+        report = await run_benchmark(fake_api, args.concurrency, args.budget)
+        print_report(report)
+
+    finally:
+        text_pool.close()
+        await Base.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_fake_api_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=hh_parser.CONCURRENCY_LIMIT)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=1000.0,
+        help="запросов в секунду на эндпоинт (по умолчанию лимитер почти не мешает)",
+    )
+    parser.add_argument(
+        "--no-processes",
+        dest="processes",
+        action="store_false",
+        help="чистить и размечать описания в основном процессе, без пула",
+    )
+
+    asyncio.run(main(parser.parse_args()))
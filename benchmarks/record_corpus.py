@@ -0,0 +1,124 @@
+"""Дописывает в корпус benchmarks/fixtures/tagging_corpus.json настоящие вакансии и работодателей с api.hh.ru.
+
+Выдача запрашивается с теми же params, что и у парсера (hh_parser.params, но без period и не только за сутки),
+у каждой вакансии берутся описание и key_skills, у её работодателя -- описание, всё как есть, до render_description.
+Записи, которые уже есть в корпусе (по id), остаются с прежней разметкой, а у новых tags и consulting -- null:
+их нужно разметить вручную по смыслу вакансии, а не по тому, что находит parse_tags, иначе precision/recall
+в benchmarks.tagging_bench будут мерить выражения ими же. Пока разметки нет, tagging_bench такие записи пропускает.
+    python -m benchmarks.record_corpus --count 200
+"""
+
+import argparse
+import asyncio
+import json
+
+from benchmarks.fake_hh_api import FIXTURES_DIR, load_fixture
+from hh_parser import BASE_URL, params
+from utils.hh_client import HHAPIError, HHClient
+
+CORPUS_PATH = FIXTURES_DIR / "tagging_corpus.json"
+
+PER_PAGE = 100
+
+
+async def fetch_vacancies(client: HHClient, count: int) -> list[dict]:
+    """Первые count вакансий выдачи с описаниями и работодателями"""
+    search_params = {key: value for key, value in params.items() if key != "period"}
+    items, page = [], 0
+
+    while len(items) < count:
+        resp = await client.get_json(
+            "/vacancies",
+            endpoint="search",
+            params={**search_params, "per_page": str(PER_PAGE), "page": str(page)},
+        )
+        items.extend(resp["items"])
+        page += 1
+
+        if page >= resp.get("pages", 0):
+            break
+
+    return await asyncio.gather(
+        *(fetch_vacancy(client, item) for item in items[:count])
+    )
+
+
+async def fetch_vacancy(client: HHClient, item: dict) -> dict:
+    vacancy = await client.get_json(f"/vacancies/{item['id']}", endpoint="vacancy")
+    employer_id = (item.get("employer") or {}).get("id")
+
+    employer = None
+    if employer_id:
+        try:
+            employer = await client.get_json(
+                f"/employers/{employer_id}", endpoint="employer"
+            )
+        except HHAPIError as e:
+            # работодатель мог закрыть профиль -- вакансия в корпусе нужна и без него
+            print(f"Работодатель {employer_id} пропущен: {e}")
+
+    return {"vacancy": vacancy, "employer": employer}
+
+
+def merge_corpus(corpus: dict, fetched: list[dict]) -> tuple[int, int]:
+    """Дописывает в corpus новые вакансии и работодателей, возвращает, сколько дописано"""
+    known_vacancy_ids = {vacancy.get("id") for vacancy in corpus["vacancies"]}
+    known_employer_ids = {employer.get("id") for employer in corpus["employers"]}
+    added_vacancies = added_employers = 0
+
+    for item in fetched:
+        vacancy, employer = item["vacancy"], item["employer"]
+
+        if vacancy["id"] not in known_vacancy_ids:
+            known_vacancy_ids.add(vacancy["id"])
+            corpus["vacancies"].append(
+                {
+                    "id": vacancy["id"],
+                    "description": vacancy["description"],
+                    "key_skills": [
+                        skill["name"] for skill in vacancy.get("key_skills") or []
+                    ],
+                    "tags": None,
+                }
+            )
+            added_vacancies += 1
+
+        if employer and employer["id"] not in known_employer_ids:
+            known_employer_ids.add(employer["id"])
+            corpus["employers"].append(
+                {
+                    "id": employer["id"],
+                    "description": employer.get("description"),
+                    "consulting": None,
+                }
+            )
+            added_employers += 1
+
+    return added_vacancies, added_employers
+
+
+async def main(args: argparse.Namespace):
+    corpus: dict = load_fixture(CORPUS_PATH.name)
+
+    async with HHClient(BASE_URL) as client:
+        fetched = await fetch_vacancies(client, args.count)
+
+    added_vacancies, added_employers = merge_corpus(corpus, fetched)
+
+    with open(CORPUS_PATH, "w", encoding="utf-8") as file:
+        json.dump(corpus, file, ensure_ascii=False, indent=4)
+        file.write("\n")
+
+    print(
+        f"Дописано вакансий: {added_vacancies}, работодателей: {added_employers}. "
+        f"Разметьте tags и consulting у записей с null в {CORPUS_PATH}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--count", type=int, default=200, help="сколько вакансий запросить"
+    )
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,310 @@
+"""Бенчмарк скорости и точности разметки на размеченном вручную корпусе (benchmarks/fixtures/tagging_corpus.json).
+
+Показывает, сколько описаний в секунду размечает parse_tags (или utils.stem_tagger с --backend stems)
+и проверяет EMPLOYER_TYPE_REGEX, а также precision/recall по каждой отрасли и по типу работодателя.
+Разметка корпуса -- по смыслу вакансии, а не по тому, что находят выражения,
+поэтому recall ниже 1 -- это настоящие пропуски utils/regex.py. Записи без id составлены вручную,
+настоящие вакансии hh.ru дописывает python -m benchmarks.record_corpus (их нужно разметить).
+Точность проверяет и pytest (tests/test_tagging.py), скорость -- только этот бенчмарк.
+
+Результаты сравниваются с benchmarks/fixtures/tagging_baseline.json: если скорость упала больше чем
+на --max-slowdown или любая метрика точности стала хуже больше чем на --max-accuracy-drop,
+бенчмарк завершается с кодом 1. Скорость в baseline хранится не в описаниях в секунду, а относительно
+эталонной нагрузки (calibration_workload), замеренной в том же процессе вперемешку с разметкой:
+так она почти не зависит от машины и её загрузки. baseline стоит перезаписать (--update-baseline)
+после осознанных изменений выражений:
+    python -m benchmarks.tagging_bench
+    python -m benchmarks.tagging_bench --backend stems
+    python -m benchmarks.tagging_bench --update-baseline
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.fake_hh_api import FIXTURES_DIR, load_fixture
+from utils.regex import TAG_CATEGORIES, parse_tags
+from utils.stem_tagger import stem_tagger
+from utils.telegram_html import render_description
+from utils.text_processing import is_consulting
+
+BASELINE_PATH = FIXTURES_DIR / "tagging_baseline.json"
+
+# допустимое падение скорости (доля от baseline) и метрик точности (абсолютное)
+MAX_SLOWDOWN = 0.25
+MAX_ACCURACY_DROP = 0.0
+
+MIN_MEASURE_TIME = 0.2  # секунд
+MEASURE_ROUNDS = 7
+
+EMPLOYER_TYPE = "Тип работодателя"
+
+
+def tag_regex(description: str, key_skills: list[str]) -> list[str]:
+    return parse_tags(description, key_skills) or []
+
+
+def tag_stems(description: str, key_skills: list[str]) -> list[str]:
+    return list(stem_tagger.tag(description, key_skills).tags)
+
+
+BACKENDS = {"regex": tag_regex, "stems": tag_stems}
+
+
+def load_corpus() -> dict:
+    corpus: dict = load_fixture("tagging_corpus.json")
+
+    # записи, которые benchmarks.record_corpus скачал с hh.ru, но ещё никто не разметил, ничего не мерят
+    corpus["vacancies"] = [
+        vacancy for vacancy in corpus["vacancies"] if vacancy["tags"] is not None
+    ]
+    corpus["employers"] = [
+        employer
+        for employer in corpus["employers"]
+        if employer["consulting"] is not None
+    ]
+
+    # размечается то же, что и в парсере: описание после render_description
+    for vacancy in corpus["vacancies"]:
+        vacancy["description"] = render_description(vacancy["description"])
+
+    return corpus
+
+
+CALIBRATION_PATTERN = re.compile(r"\w+")
+
+
+def calibration_workload(text: str) -> int:
+    """Эталонная нагрузка того же рода, что и разметка (регулярное выражение и цикл на Python),
+    но не зависящая от кода бота: относительно неё и меряется скорость"""
+    return sum(len(word) for word in CALIBRATION_PATTERN.findall(text.lower()))
+
+
+def measure_round(func, items: list, min_time: float) -> float:
+    """Сколько items в секунду обрабатывает func, если гонять их по кругу не меньше min_time секунд"""
+    processed, started = 0, time.perf_counter()
+
+    while True:
+        for item in items:
+            func(item)
+        processed += len(items)
+
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return processed / elapsed
+
+
+def measure_throughput(
+    func, items: list, texts: list[str], min_time: float, rounds: int = MEASURE_ROUNDS
+) -> tuple[float, float]:
+    """(items в секунду, скорость относительно calibration_workload на texts).
+    Раунды разметки и эталона чередуются, и берётся медиана отношений по раундам:
+    замедление всей машины на время раунда сказывается на обоих замерах одинаково"""
+    speeds, ratios = [], []
+
+    for _ in range(rounds):
+        calibration_speed = measure_round(calibration_workload, texts, min_time)
+        speed = measure_round(func, items, min_time)
+
+        speeds.append(speed)
+        ratios.append(speed / calibration_speed)
+
+    return round(max(speeds), 1), round(statistics.median(ratios), 4)
+
+
+def precision_recall(true_positive: int, false_positive: int, false_negative: int):
+    # ничего не нашли -- нет и ложных срабатываний, нечего было находить -- ничего и не пропустили
+    precision = (
+        true_positive / (true_positive + false_positive)
+        if true_positive + false_positive
+        else 1.0
+    )
+    recall = (
+        true_positive / (true_positive + false_negative)
+        if true_positive + false_negative
+        else 1.0
+    )
+
+    return round(precision, 4), round(recall, 4)
+
+
+def measure_accuracy(corpus: dict, tag) -> dict[str, dict[str, float]]:
+    accuracy = {}
+
+    for _, tag_name, _ in TAG_CATEGORIES:
+        true_positive = false_positive = false_negative = 0
+
+        for vacancy in corpus["vacancies"]:
+            expected = tag_name in vacancy["tags"]
+            found = tag_name in tag(vacancy["description"], vacancy["key_skills"])
+
+            true_positive += expected and found
+            false_positive += found and not expected
+            false_negative += expected and not found
+
+        precision, recall = precision_recall(
+            true_positive, false_positive, false_negative
+        )
+        accuracy[tag_name] = {"precision": precision, "recall": recall}
+
+    true_positive = false_positive = false_negative = 0
+    for employer in corpus["employers"]:
+        expected = employer["consulting"]
+        found = is_consulting(employer["description"])
+
+        true_positive += expected and found
+        false_positive += found and not expected
+        false_negative += expected and not found
+
+    precision, recall = precision_recall(true_positive, false_positive, false_negative)
+    accuracy[EMPLOYER_TYPE] = {"precision": precision, "recall": recall}
+
+    return accuracy
+
+
+def run_benchmark(backend: str, min_time: float) -> dict:
+    corpus = load_corpus()
+    tag = BACKENDS[backend]
+
+    tags_speed, tags_ratio = measure_throughput(
+        lambda vacancy: tag(vacancy["description"], vacancy["key_skills"]),
+        corpus["vacancies"],
+        [vacancy["description"] for vacancy in corpus["vacancies"]],
+        min_time,
+    )
+    employer_type_speed, employer_type_ratio = measure_throughput(
+        lambda employer: is_consulting(employer["description"]),
+        corpus["employers"],
+        [employer["description"] or "" for employer in corpus["employers"]],
+        min_time,
+    )
+
+    return {
+        # описаний в секунду на этой машине -- только для отчёта
+        "speed": {"tags": tags_speed, "employer_type": employer_type_speed},
+        # во сколько раз быстрее calibration_workload на тех же текстах -- с этим сравнивается baseline
+        "throughput": {"tags": tags_ratio, "employer_type": employer_type_ratio},
+        "accuracy": measure_accuracy(corpus, tag),
+    }
+
+
+def find_regressions(
+    report: dict, baseline: dict, max_slowdown: float, max_accuracy_drop: float
+) -> list[str]:
+    regressions = []
+
+    for name, ratio in report["throughput"].items():
+        baseline_ratio = baseline["throughput"].get(name)
+        if baseline_ratio and ratio < baseline_ratio * (1 - max_slowdown):
+            regressions.append(
+                f"скорость {name}: {ratio:.3f} эталона против {baseline_ratio:.3f} в baseline"
+            )
+
+    for category, metrics in report["accuracy"].items():
+        for metric, value in metrics.items():
+            baseline_value = baseline["accuracy"].get(category, {}).get(metric)
+            if (
+                baseline_value is not None
+                and value < baseline_value - max_accuracy_drop
+            ):
+                regressions.append(
+                    f"{metric} «{category}»: {value:.2f} против {baseline_value:.2f} в baseline"
+                )
+
+    return regressions
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict:
+    if not path.exists():
+        return {}
+
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_baseline(baseline: dict, path: Path = BASELINE_PATH):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, ensure_ascii=False, indent=4)
+        file.write("\n")
+
+
+def print_report(backend: str, report: dict, baseline: dict or None):
+    print(f"Разметка ({backend}):")
+    for name, ratio in report["throughput"].items():
+        baseline_ratio = (baseline or {}).get("throughput", {}).get(name)
+        change = (
+            f" ({ratio / baseline_ratio - 1:+.0%} к baseline)" if baseline_ratio else ""
+        )
+        print(
+            f"  {name:<16}{report['speed'][name]:>10.0f} описаний/с, "
+            f"{ratio:.3f} эталона{change}"
+        )
+
+    print(f"\n{'категория':<34}{'precision':>10}{'recall':>10}")
+    for category, metrics in report["accuracy"].items():
+        print(f"{category:<34}{metrics['precision']:>10.2f}{metrics['recall']:>10.2f}")
+
+
+def main(args: argparse.Namespace) -> int:
+    baselines = load_baseline()
+    baseline: dict or None = baselines.get(args.backend)
+
+    report = run_benchmark(args.backend, args.min_time)
+    print_report(args.backend, report, baseline)
+
+    if args.update_baseline:
+        # описаний в секунду -- свойство машины, в baseline им не место
+        baselines[args.backend] = {
+            key: value for key, value in report.items() if key != "speed"
+        }
+        save_baseline(baselines)
+        print(f"\nbaseline для {args.backend} записан в {BASELINE_PATH}")
+        return 0
+
+    if not baseline:
+        print(f"\nНет baseline для {args.backend}, сравнивать не с чем")
+        return 0
+
+    regressions = find_regressions(
+        report, baseline, args.max_slowdown, args.max_accuracy_drop
+    )
+    if regressions:
+        print("\nРегрессии:\n  " + "\n  ".join(regressions))
+        return 1
+
+    print("\nРегрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=BACKENDS, default="regex")
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=MIN_MEASURE_TIME,
+        help="секунд на каждый раунд замера скорости",
+    )
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=MAX_SLOWDOWN,
+        help="допустимое падение скорости, доля от baseline",
+    )
+    parser.add_argument(
+        "--max-accuracy-drop",
+        type=float,
+        default=MAX_ACCURACY_DROP,
+        help="допустимое падение precision/recall",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="записать результаты как новый baseline вместо проверки",
+    )
+
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""Рассылка вакансий подписчикам: по расписанию (parse_and_send) и из админки (send_vacancy)"""
+
+from aiogram import types
+from aiogram.utils.exceptions import RetryAfter, TelegramAPIError
+import aiohttp
+import asyncio
+import logging
+
+from SETTINGS import bot
+from db import (
+    complete_vacancies,
+    get_finished_recipients,
+    iter_unsent_vacancies,
+    iter_vacancy_matches,
+    record_deliveries,
+    subscriber_index,
+    Vacancy,
+)
+from hh_parser import parse_vacancies
+from utils.hh_client import TokenBucket
+from utils.vacancy_messages import VacancyMessage, vacancy_messages
+
+
+logger = logging.getLogger(__name__)
+
+# сообщений в секунду: Telegram пускает не больше ~30 в секунду от одного бота
+SEND_RATE = 25
+
+# общий на все рассылки темп отправки; на RetryAfter встаёт на паузу для всех сразу
+send_bucket = TokenBucket(rate=SEND_RATE)
+
+
+async def safe_send_message(telegram_id: int, message: VacancyMessage) -> bool:
+    """get_message_text отдаёт только разметку, которую понимает Telegram (utils.telegram_html),
+    поэтому сообщение всегда уходит в HTML одним запросом.
+    message уже отрендерен (utils.vacancy_messages), здесь остаётся только отправить.
+    Сообщения уходят не быстрее SEND_RATE в секунду (send_bucket). На RetryAfter (flood control)
+    отправка ждёт, сколько попросил Telegram, и повторяется -- попыткой доставки это не считается.
+    Остальные ошибки отправки одному пользователю не прерывают рассылку: возвращается False,
+    и неудача записывается в журнал (record_deliveries), чтобы дослать в следующий раз
+    """
+    while True:
+        await send_bucket.acquire()
+
+        try:
+            await bot.send_message(
+                chat_id=telegram_id,
+                text=message.text,
+                parse_mode=types.ParseMode.HTML,
+                reply_markup=message.reply_markup,
+            )
+
+        except RetryAfter as e:
+            send_bucket.throttle(retry_after=e.timeout)
+            continue
+
+        except (TelegramAPIError, asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.warning("Не удалось отправить вакансию %s: %s", telegram_id, e)
+            return False
+
+        send_bucket.succeed()
+        return True
+
+
+async def send_vacancy(vacancy: Vacancy):
+    # получатели подбираются в памяти (subscriber_index), без запроса к БД по users;
+    # кому вакансия уже доставлена или у кого кончились попытки -- как в iter_vacancy_matches, не шлём
+    telegram_ids: list[int] = sorted(
+        await subscriber_index.match(vacancy)
+        - await get_finished_recipients(vacancy.hh_id)
+    )
+    # текст и клавиатура одинаковы для всех получателей -- рендерятся один раз на вакансию
+    message: VacancyMessage = vacancy_messages.get(vacancy).short
+    requests = [
+        safe_send_message(telegram_id=telegram_id, message=message)
+        for telegram_id in telegram_ids
+    ]
+
+    delivered: list[bool] = await asyncio.gather(*requests)
+    await record_deliveries(
+        [
+            (vacancy.hh_id, telegram_id, is_delivered)
+            for telegram_id, is_delivered in zip(telegram_ids, delivered)
+        ]
+    )
+    await complete_vacancies([vacancy.hh_id])
+
+
+async def send_unsent_vacancies():
+    """Рассылает все неотправленные вакансии: пары (вакансия, пользователь) считаются
+    по пачке вакансий за раз (iter_unsent_vacancies, iter_vacancy_matches) и отправляются по мере чтения.
+    Результат каждой пачки сразу пишется в журнал (Delivery), поэтому прерванная рассылка
+    продолжается с недоставленного, а не начинается заново"""
+    async for vacancies in iter_unsent_vacancies():
+        messages: dict[int, VacancyMessage] = {
+            vacancy.hh_id: vacancy_messages.get_short(vacancy) for vacancy in vacancies
+        }
+
+        async for matches in iter_vacancy_matches(list(messages)):
+            requests = [
+                safe_send_message(telegram_id=telegram_id, message=messages[hh_id])
+                for hh_id, telegram_id in matches
+            ]
+
+            delivered: list[bool] = await asyncio.gather(*requests)
+            await record_deliveries(
+                [
+                    (hh_id, telegram_id, is_delivered)
+                    for (hh_id, telegram_id), is_delivered in zip(matches, delivered)
+                ]
+            )
+
+        # вакансии, которые никому не подошли, тоже считаются отправленными;
+        # с недоставленными остаются неотправленными до следующей рассылки
+        await complete_vacancies(list(messages))
+
+
+async def parse_and_send():
+    """Ночная задача: парсинг новых вакансий и рассылка неотправленных"""
+    new_hh_ids: set[int] = await parse_vacancies()
+    logger.info("Новых вакансий: %s", len(new_hh_ids))
+
+    # рассылаются не только новые вакансии, но и те, что не удалось доставить в прошлые разы:
+    # они тоже остаются неотправленными (is_sent = false)
+    await send_unsent_vacancies()
@@ -1,4 +1,7 @@
+import asyncio
+import bisect
 import datetime
+from typing import AsyncIterator, NamedTuple
 from SETTINGS import postgres_settings as p
 from sqlalchemy import (
     ChunkedIteratorResult,
@@ -10,12 +13,21 @@ from sqlalchemy import (
     Boolean,
     DateTime,
 )
-from sqlalchemy import select, update
+from sqlalchemy import and_, exists, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import ARRAY, JSON
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    mapped_column,
+    relationship,
+    defer,
+    validates,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSON, array, insert
 from sqlalchemy.ext.mutable import MutableList
 
+from migrations import apply_migrations
+
 engine = create_async_engine(
     url=f'postgresql+asyncpg://{p["user"]}:{p["password"]}@{p["host"]}:{p["port"]}/{p["db"]}',
     echo=True,
@@ -31,6 +43,8 @@ class Base(AsyncAttrs, DeclarativeBase):
     async def start():
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            # индексы и изменения уже существующих таблиц (migrations.py)
+            await apply_migrations(conn)
 
     @staticmethod
     async def shutdown():
@@ -52,27 +66,101 @@ class Employer_Type(Base):
     name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
 
 
-async def get_employers_types(reverse: bool = False) -> dict:
-    async with async_session() as session:
-        employers_types: ChunkedIteratorResult[
-            (Employer_Type.id, Employer_Type.name)
-        ] = await session.execute(select(Employer_Type.id, Employer_Type.name))
+class ReferenceData:
+    """Справочники (Employer_Type) в памяти процесса: они почти не меняются,
+    а нужны на каждую вакансию. Загружаются в on_startup через load() (или лениво при первом обращении).
+    Пустой справочник (строки ещё не заведены) не запоминается и перечитывается при следующем обращении,
+    изменённые строки подхватываются после перезапуска бота
+    """
+
+    models = (Employer_Type,)
+
+    def __init__(self):
+        # модель -> {id: name}
+        self._names_by_id: dict[type, dict[int, str]] = {}
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        async with async_session() as session:
+            for model in self.models:
+                rows: ChunkedIteratorResult[(int, str)] = await session.execute(
+                    select(model.id, model.name)
+                )
+                names_by_id = {row[0]: row[1] for row in rows.all()}
+
+                if names_by_id:
+                    self._names_by_id[model] = names_by_id
+
+    async def get(self, model: type, reverse: bool = False) -> dict:
+        if model not in self._names_by_id:
+            async with self._lock:
+                if model not in self._names_by_id:
+                    await self.load()
+
+        names_by_id: dict[int, str] = self._names_by_id.get(model, {})
 
         # Вид возвращаемого поля: 'Консалтинг' : 0
         if reverse:
-            employers_types_as_dict = {
-                employer_type[1]: employer_type[0]
-                for employer_type in employers_types.all()
-            }
+            return {name: id for id, name in names_by_id.items()}
 
         # Вид возвращаемого поля: 0 : 'Консалтинг'
-        else:
-            employers_types_as_dict = {
-                employer_type[0]: employer_type[1]
-                for employer_type in employers_types.all()
-            }
+        return dict(names_by_id)
+
+
+reference_data = ReferenceData()
+
+
+async def get_employers_types(reverse: bool = False) -> dict:
+    return await reference_data.get(Employer_Type, reverse=reverse)
+
+
+class Employer(Base):
+    """Кэш классификации работодателей с hh.ru (Консалтинг/Инхаус),
+    чтобы не запрашивать /employers/{id} для каждой вакансии одного и того же работодателя
+    """
+
+    __tablename__ = "employers"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    hh_id: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    employer_type_id: Mapped[int] = mapped_column(
+        ForeignKey("employers_types.id"), nullable=False
+    )
+    fetched_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, unique=False, nullable=False
+    )
+
+    async def add_or_update(self):
+        async with async_session() as session:
+            existing_employer: ChunkedIteratorResult = await session.execute(
+                select(Employer).where(Employer.hh_id == self.hh_id)
+            )
+
+            if not existing_employer.scalar_one_or_none():
+                session.add(self)
+
+                await session.commit()
+
+            else:
+                await session.execute(
+                    update(Employer)
+                    .where(Employer.hh_id == self.hh_id)
+                    .values(
+                        employer_type_id=self.employer_type_id,
+                        fetched_at=self.fetched_at,
+                    )
+                )
+
+                await session.commit()
 
-        return employers_types_as_dict
+
+async def get_employer_by_id(hh_id: str) -> Employer or None:
+    async with async_session() as session:
+        employer: ChunkedIteratorResult[Employer] = await session.execute(
+            select(Employer).where(Employer.hh_id == hh_id)
+        )
+
+        return employer.scalar_one_or_none()
 
 
 class User(Base):
@@ -125,6 +213,164 @@ class User(Base):
 
                 await session.commit()
 
+        subscriber_index.update(self)
+
+
+class Subscriber(NamedTuple):
+    telegram_id: int
+    experience_id: int
+    salary: int
+    tags: frozenset[str]
+    desired_employer_type_names: frozenset[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Subscriber":
+        return cls(
+            telegram_id=user.telegram_id,
+            experience_id=user.experience_id,
+            salary=user.salary,
+            tags=frozenset(user.tags),
+            desired_employer_type_names=frozenset(user.desired_employer_type_names),
+        )
+
+
+class SubscriberBucket:
+    """Подписчики с одинаковыми (тег, опыт, тип работодателя), отсортированные по зарплатным ожиданиям:
+    подходящие по зарплате -- это всегда начало или конец списка, и он находится бинарным поиском
+    """
+
+    def __init__(self):
+        self.salaries: list[int] = []
+        self.telegram_ids: list[int] = []  # в том же порядке, что и salaries
+
+    def __len__(self) -> int:
+        return len(self.salaries)
+
+    def add(self, salary: int, telegram_id: int):
+        index = bisect.bisect_right(self.salaries, salary)
+        self.salaries.insert(index, salary)
+        self.telegram_ids.insert(index, telegram_id)
+
+    def remove(self, salary: int, telegram_id: int):
+        start = bisect.bisect_left(self.salaries, salary)
+        end = bisect.bisect_right(self.salaries, salary)
+        index = self.telegram_ids.index(telegram_id, start, end)
+
+        del self.salaries[index]
+        del self.telegram_ids[index]
+
+    def at_most(self, salary: int) -> list[int]:
+        """Пользователи, которые ждут не больше salary"""
+        return self.telegram_ids[: bisect.bisect_right(self.salaries, salary)]
+
+    def at_least(self, salary: int) -> list[int]:
+        """Пользователи, которые ждут не меньше salary"""
+        return self.telegram_ids[bisect.bisect_left(self.salaries, salary) :]
+
+
+class SubscriberIndex:
+    """Обратный индекс подписчиков в памяти процесса: (тег, опыт, тип работодателя) -> SubscriberBucket.
+    Подбор получателей для одной вакансии (match) -- те же условия, что и в vacancy_matches_query,
+    но без запроса к БД: по бакету на каждый тег вакансии и бинарный поиск по зарплате.
+    Журнал рассылки (Delivery) match не учитывает: уже получивших вакансию отсеивает вызывающий
+    (get_finished_recipients). Совпадение с vacancy_matches_query проверяет tests/test_matching.py.
+    Загружается в on_startup через load() (или лениво при первом match),
+    дальше обновляется в User.add_or_update (update) -- перечитывать таблицу users не нужно
+    """
+
+    def __init__(self):
+        self._subscribers: dict[int, Subscriber] = {}  # telegram_id -> Subscriber
+        self._buckets: dict[tuple[str, int, str], SubscriberBucket] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    @staticmethod
+    def _keys(subscriber: Subscriber) -> list[tuple[str, int, str]]:
+        return [
+            (tag, subscriber.experience_id, employer_type_name)
+            for tag in subscriber.tags
+            for employer_type_name in subscriber.desired_employer_type_names
+        ]
+
+    def _add(self, subscriber: Subscriber):
+        self._subscribers[subscriber.telegram_id] = subscriber
+
+        for key in self._keys(subscriber):
+            bucket = self._buckets.setdefault(key, SubscriberBucket())
+            bucket.add(subscriber.salary, subscriber.telegram_id)
+
+    def _remove(self, telegram_id: int):
+        subscriber: Subscriber or None = self._subscribers.pop(telegram_id, None)
+        if not subscriber:
+            return
+
+        for key in self._keys(subscriber):
+            bucket = self._buckets[key]
+            bucket.remove(subscriber.salary, subscriber.telegram_id)
+            if not bucket:
+                del self._buckets[key]
+
+    async def load(self):
+        async with async_session() as session:
+            users: ChunkedIteratorResult[User] = await session.execute(select(User))
+            subscribers = [Subscriber.from_user(user[0]) for user in users]
+
+        self._subscribers.clear()
+        self._buckets.clear()
+        for subscriber in subscribers:
+            self._add(subscriber)
+
+        self._loaded = True
+
+    def update(self, user: User):
+        """Заменяет подписку пользователя на текущие значения user (новый пользователь просто добавляется).
+        До загрузки индекса ничего не делает: load() всё равно прочитает пользователя из БД
+        """
+        if not self._loaded:
+            return
+
+        self._remove(user.telegram_id)
+        self._add(Subscriber.from_user(user))
+
+    async def match(self, vacancy: "Vacancy") -> set[int]:
+        """telegram_id пользователей, подходящих под вакансию по тегам, опыту,
+        зарплатным ожиданиям и типу работодателя"""
+        if not self._loaded:
+            async with self._lock:
+                if not self._loaded:
+                    await self.load()
+
+        employers_types_as_dict = await get_employers_types()
+        employer_type_name: str or None = employers_types_as_dict.get(
+            vacancy.employer_type_id
+        )
+        if not employer_type_name:
+            return set()
+
+        telegram_ids: set[int] = set()
+
+        for tag in set(vacancy.tags):
+            bucket: SubscriberBucket or None = self._buckets.get(
+                (tag, vacancy.experience_id, employer_type_name)
+            )
+            if not bucket:
+                continue
+
+            if vacancy.salary_to:
+                telegram_ids.update(bucket.at_most(vacancy.salary_to))
+            elif vacancy.salary_from:
+                telegram_ids.update(bucket.at_least(vacancy.salary_from))
+            else:
+                telegram_ids.update(bucket.telegram_ids)
+
+        return telegram_ids
+
+
+subscriber_index = SubscriberIndex()
+
 
 async def check_if_user_exists(telegram_id: int) -> bool:
     async with async_session() as session:
@@ -157,6 +403,14 @@ async def enable_or_disable_admin(telegram_id: int, is_admin: bool):
         await session.commit()
 
 
+def salary_bounds(salary: dict or None) -> tuple[int or None, int or None]:
+    """(from, to) из зарплаты вакансии в формате hh.ru, 0 и отсутствующая граница -- None"""
+    if not salary:
+        return None, None
+
+    return int(salary.get("from") or 0) or None, int(salary.get("to") or 0) or None
+
+
 class Vacancy(Base):
     __tablename__ = "vacancies"
 
@@ -172,6 +426,9 @@ class Vacancy(Base):
         ForeignKey("experience_types.id"), nullable=False
     )
     salary: Mapped[dict] = mapped_column(JSON, unique=False, nullable=True)
+    # границы salary для подбора пользователей, заполняются вместе с salary (validate_salary)
+    salary_from: Mapped[int] = mapped_column(Integer, unique=False, nullable=True)
+    salary_to: Mapped[int] = mapped_column(Integer, unique=False, nullable=True)
     address: Mapped[str] = mapped_column(String, unique=False, nullable=True)
     metro_stations: Mapped[list[str]] = mapped_column(
         MutableList.as_mutable(ARRAY(String)), nullable=True
@@ -187,6 +444,11 @@ class Vacancy(Base):
     )
     description: Mapped[str] = mapped_column(Text, unique=False, nullable=False)
 
+    @validates("salary")
+    def validate_salary(self, key: str, salary: dict or None) -> dict or None:
+        self.salary_from, self.salary_to = salary_bounds(salary)
+        return salary
+
     async def add(self):
         async with async_session() as session:
             existing_vacancy: ChunkedIteratorResult[Vacancy] = await session.execute(
@@ -196,59 +458,327 @@ class Vacancy(Base):
                 session.add(self)
                 await session.commit()
 
-    async def change_status(self):
-        """Меняет is_sent отправленной вакансии на True"""
-        async with async_session() as session:
-            await session.execute(
-                update(Vacancy).where(Vacancy.hh_id == self.hh_id).values(is_sent=True)
-            )
 
-            await session.commit()
+async def get_vacancy_by_id(vacancy_id: int) -> Vacancy or None:
+    async with async_session() as session:
+        vacancy: ChunkedIteratorResult[Vacancy] = await session.execute(
+            select(Vacancy).where(Vacancy.hh_id == vacancy_id)
+        )
 
-    async def get_suitable_users(self) -> ChunkedIteratorResult[User]:
-        """Выбирает из базы пользователей, подходящих под вакансию
-        по тегам, опыту и зарплатным ожиданиям"""
-        async with async_session() as session:
+        return vacancy.scalar_one_or_none()
+
+
+# сколько вакансий уходит в один INSERT (у asyncpg не больше 32767 параметров на запрос)
+VACANCIES_BATCH_SIZE = 500
+
+
+def vacancy_as_row(vacancy: Vacancy) -> dict:
+    """Значения колонок вакансии для INSERT; у незаполненных полей с default (is_sent, from_admin) --
+    их default, как при session.add"""
+    row = {}
+
+    for column in Vacancy.__table__.columns:
+        if column.primary_key:
+            continue
+
+        value = getattr(vacancy, column.key)
+        if value is None and column.default is not None:
+            value = column.default.arg
+
+        row[column.key] = value
+
+    return row
+
+
+async def add_vacancies(vacancies: list[Vacancy]) -> set[int]:
+    """Сохраняет вакансии пачками по VACANCIES_BATCH_SIZE, каждую пачку -- одним
+    INSERT ... ON CONFLICT (hh_id) DO NOTHING в одной транзакции: уже сохранённые вакансии не трогаются.
+
+    Возвращает hh_id вакансий, которых раньше не было в БД
+    """
+    new_hh_ids = set()
+    if not vacancies:
+        return new_hh_ids
+
+    async with async_session() as session:
+        for start in range(0, len(vacancies), VACANCIES_BATCH_SIZE):
+            rows = [
+                vacancy_as_row(vacancy)
+                for vacancy in vacancies[start : start + VACANCIES_BATCH_SIZE]
+            ]
             query = (
-                select(User)
-                .where(User.tags.overlap(self.tags))
-                .where(User.experience_id == self.experience_id)
+                insert(Vacancy)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=[Vacancy.hh_id])
+                # RETURNING отдаёт только вставленные строки
+                .returning(Vacancy.hh_id)
+            )
+
+            result = await session.execute(query)
+            new_hh_ids.update(result.scalars())
+
+        await session.commit()
+
+    return new_hh_ids
+
+
+async def get_known_hh_ids(hh_ids: list[int]) -> set[int]:
+    """Одним запросом возвращает те hh_id из переданных, которые уже есть в БД"""
+    if not hh_ids:
+        return set()
+
+    async with async_session() as session:
+        known_hh_ids: ChunkedIteratorResult[int] = await session.execute(
+            select(Vacancy.hh_id).where(Vacancy.hh_id.in_(hh_ids))
+        )
+
+        return set(known_hh_ids.scalars().all())
+
+
+# сколько неотправленных вакансий iter_unsent_vacancies отдаёт за раз
+UNSENT_VACANCIES_CHUNK_SIZE = 100
+
+
+def unsent_vacancies_query():
+    # условие совпадает с условием частичного индекса ix_vacancies_unsent (migrations.py),
+    # он же отдаёт строки в порядке hh_id
+    return select(Vacancy).where(Vacancy.is_sent == False).order_by(Vacancy.hh_id)
+
+
+async def iter_unsent_vacancies(
+    chunk_size: int = UNSENT_VACANCIES_CHUNK_SIZE,
+) -> AsyncIterator[list[Vacancy]]:
+    """Неотправленные вакансии пачками по chunk_size. Строки читаются серверным курсором по мере обработки
+    пачек, поэтому в памяти не больше одной пачки, сколько бы вакансий ни накопилось.
+    description не загружается (в коротком сообщении рассылки его нет), обращение к нему -- ошибка
+    """
+    query = (
+        unsent_vacancies_query()
+        .options(defer(Vacancy.description, raiseload=True))
+        .execution_options(yield_per=chunk_size)
+    )
+
+    async with async_session() as session:
+        vacancies = await session.stream_scalars(query)
+
+        async for chunk in vacancies.partitions(chunk_size):
+            yield list(chunk)
+
+
+DELIVERY_SENT = "sent"
+DELIVERY_FAILED = "failed"
+
+# после стольких неудачных попыток пользователь больше не получает вакансию (например, заблокировал бота)
+DELIVERY_MAX_ATTEMPTS = 3
+
+
+class Delivery(Base):
+    """Журнал рассылки: одна строка на пару (вакансия, получатель) с результатом последней попытки.
+    По нему iter_vacancy_matches пропускает уже доставленное, а complete_vacancies
+    решает, разослана ли вакансия целиком"""
+
+    __tablename__ = "deliveries"
+
+    vacancy_id: Mapped[int] = mapped_column(
+        ForeignKey("vacancies.hh_id"), primary_key=True
+    )
+    telegram_id: Mapped[int] = mapped_column(
+        ForeignKey("users.telegram_id"), primary_key=True
+    )
+    status: Mapped[str] = mapped_column(String, unique=False, nullable=False)
+    attempt: Mapped[int] = mapped_column(Integer, unique=False, nullable=False)
+    sent_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, unique=False, nullable=True
+    )
+
+
+def delivery_finished():
+    """Условие на строку Delivery: доставлено или попытки кончились -- больше не отправляется"""
+    return (Delivery.status == DELIVERY_SENT) | (
+        Delivery.attempt >= DELIVERY_MAX_ATTEMPTS
+    )
+
+
+# сколько пар (вакансия, пользователь) iter_vacancy_matches отдаёт за раз
+MATCHES_CHUNK_SIZE = 500
+
+
+def salary_matches():
+    """Зарплатное условие подбора пользователей: если у вакансии есть salary_to -- salary_to >= User.salary,
+    иначе если есть salary_from -- salary_from <= User.salary, иначе (зарплата не указана) -- без условия
+    """
+    return or_(
+        Vacancy.salary_to >= User.salary,
+        and_(
+            Vacancy.salary_to.is_(None),
+            or_(Vacancy.salary_from <= User.salary, Vacancy.salary_from.is_(None)),
+        ),
+    )
+
+
+def vacancy_matches_query(hh_ids: list[int]):
+    return (
+        select(Vacancy.hh_id, User.telegram_id)
+        .join(Employer_Type, Employer_Type.id == Vacancy.employer_type_id)
+        .join(
+            User,
+            User.tags.overlap(Vacancy.tags)
+            & (User.experience_id == Vacancy.experience_id)
+            & User.desired_employer_type_names.contains(array([Employer_Type.name]))
+            & salary_matches(),
+        )
+        .where(Vacancy.hh_id.in_(hh_ids))
+        .where(
+            ~exists()
+            .where(Delivery.vacancy_id == Vacancy.hh_id)
+            .where(Delivery.telegram_id == User.telegram_id)
+            .where(delivery_finished())
+        )
+        .order_by(Vacancy.hh_id, User.telegram_id)
+    )
+
+
+async def iter_vacancy_matches(
+    hh_ids: list[int], chunk_size: int = MATCHES_CHUNK_SIZE
+) -> AsyncIterator[list[tuple[int, int]]]:
+    """Все пары (hh_id вакансии, telegram_id пользователя) для переданных вакансий одним запросом
+    по тегам, опыту, зарплате и типу работодателя,
+    кроме уже доставленных и тех, где кончились попытки (Delivery). Пары отдаются пачками по chunk_size по мере чтения из курсора, отсортированными по вакансии
+    """
+    if not hh_ids:
+        return
+
+    query = vacancy_matches_query(hh_ids).execution_options(yield_per=chunk_size)
+
+    async with async_session() as session:
+        matches = await session.stream(query)
+
+        async for chunk in matches.partitions(chunk_size):
+            yield [(hh_id, telegram_id) for hh_id, telegram_id in chunk]
+
+
+def finished_recipients_query(hh_id: int):
+    return (
+        select(Delivery.telegram_id)
+        .where(Delivery.vacancy_id == hh_id)
+        .where(delivery_finished())
+    )
+
+
+async def get_finished_recipients(hh_id: int) -> set[int]:
+    """telegram_id, которым вакансию больше не отправляют: уже доставлено или кончились попытки"""
+    async with async_session() as session:
+        telegram_ids: ChunkedIteratorResult[int] = await session.execute(
+            finished_recipients_query(hh_id)
+        )
+
+        return set(telegram_ids.scalars().all())
+
+
+# сколько строк журнала уходит в один INSERT (по 5 параметров на строку)
+DELIVERIES_BATCH_SIZE = 1000
+
+
+async def record_deliveries(results: list[tuple[int, int, bool]]):
+    """Записывает в журнал результаты отправки (hh_id вакансии, telegram_id, доставлено ли)
+    многострочными INSERT; у уже известных пар обновляется статус и растёт attempt"""
+    if not results:
+        return
+
+    now = datetime.datetime.now()
+    rows = [
+        {
+            "vacancy_id": hh_id,
+            "telegram_id": telegram_id,
+            "status": DELIVERY_SENT if delivered else DELIVERY_FAILED,
+            "attempt": 1,
+            "sent_at": now if delivered else None,
+        }
+        for hh_id, telegram_id, delivered in results
+    ]
+
+    async with async_session() as session:
+        for start in range(0, len(rows), DELIVERIES_BATCH_SIZE):
+            query = insert(Delivery).values(rows[start : start + DELIVERIES_BATCH_SIZE])
+            query = query.on_conflict_do_update(
+                index_elements=[Delivery.vacancy_id, Delivery.telegram_id],
+                set_={
+                    "status": query.excluded.status,
+                    "attempt": Delivery.attempt + 1,
+                    "sent_at": query.excluded.sent_at,
+                },
             )
 
-            if self.salary:
-                if self.salary.get("to"):
-                    query = query.filter(self.salary["to"] >= User.salary)
-                elif self.salary.get("from"):
-                    query = query.filter(self.salary["from"] <= User.salary)
+            await session.execute(query)
+
+        await session.commit()
 
-            employers_types_as_dict = await get_employers_types()
 
-            current_employer_type: str = employers_types_as_dict[self.employer_type_id]
+async def complete_vacancies(hh_ids: list[int]) -> set[int]:
+    """Помечает отправленными (is_sent) те из вакансий, у которых в журнале не осталось
+    недоставленных получателей с оставшимися попытками, и возвращает их hh_id.
+    Остальные остаются неотправленными и досылаются при следующей рассылке"""
+    if not hh_ids:
+        return set()
 
-            query = query.where(
-                User.desired_employer_type_names.contains([current_employer_type])
+    async with async_session() as session:
+        completed_hh_ids: ChunkedIteratorResult[int] = await session.execute(
+            update(Vacancy)
+            .where(Vacancy.hh_id.in_(hh_ids))
+            .where(
+                ~exists()
+                .where(Delivery.vacancy_id == Vacancy.hh_id)
+                .where(~delivery_finished())
             )
+            .values(is_sent=True)
+            .returning(Vacancy.hh_id)
+        )
+        completed_hh_ids: set[int] = set(completed_hh_ids.scalars().all())
+
+        await session.commit()
 
-            suitable_users: ChunkedIteratorResult[User] = await session.execute(query)
+    return completed_hh_ids
 
-            return suitable_users
 
+class CrawlState(Base):
+    """Высшая отметка (watermark) парсера: published_at самой свежей вакансии,
+    увиденной в последнем успешном запуске"""
 
-async def get_vacancy_by_id(vacancy_id: int) -> Vacancy or None:
+    __tablename__ = "crawl_state"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    watermark: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), unique=False, nullable=False
+    )
+
+
+async def get_watermark(name: str) -> datetime.datetime or None:
     async with async_session() as session:
-        vacancy: ChunkedIteratorResult[Vacancy] = await session.execute(
-            select(Vacancy).where(Vacancy.hh_id == vacancy_id)
+        crawl_state: ChunkedIteratorResult[CrawlState] = await session.execute(
+            select(CrawlState).where(CrawlState.name == name)
         )
+        crawl_state: CrawlState or None = crawl_state.scalar_one_or_none()
 
-        return vacancy.scalar_one_or_none()
+        return crawl_state.watermark if crawl_state else None
 
 
-async def get_unsent_vacancies() -> ChunkedIteratorResult[Vacancy]:
+async def set_watermark(name: str, watermark: datetime.datetime):
     async with async_session() as session:
-        vacancies: ChunkedIteratorResult[Vacancy] = await session.execute(
-            select(Vacancy).where(Vacancy.is_sent == False)
+        existing_crawl_state: ChunkedIteratorResult = await session.execute(
+            select(CrawlState).where(CrawlState.name == name)
         )
-        return vacancies
+
+        if not existing_crawl_state.scalar_one_or_none():
+            session.add(CrawlState(name=name, watermark=watermark))
+
+        else:
+            await session.execute(
+                update(CrawlState)
+                .where(CrawlState.name == name)
+                .values(watermark=watermark)
+            )
+
+        await session.commit()
 
 
 class Review(Base):
@@ -290,11 +820,16 @@ class Review(Base):
             await session.commit()
 
 
+def unresolved_reviews_query():
+    # условие совпадает с условием частичного индекса ix_reviews_unresolved (migrations.py)
+    return select(Review).where(Review.resolved == None)
+
+
 async def get_random_review() -> Review:
     """Достаёт любой Review из соответствующей таблицы, чтобы направить админу для разрешения"""
     async with async_session() as session:
         unsolved_reviews: ChunkedIteratorResult[Review] = await session.execute(
-            select(Review).where(Review.resolved == None)
+            unresolved_reviews_query()
         )
 
         return unsolved_reviews.first()[0]
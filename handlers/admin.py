@@ -12,7 +12,7 @@ from db import (
     get_review_by_id,
 )
 from keyboards import resolve_review_kb
-from main import send_vacancy
+from broadcast import send_vacancy
 from SETTINGS import bot
 from utils.general import strong, admin_only
 from utils.prefetch_vacancy import prefetch_vacancy
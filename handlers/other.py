@@ -3,12 +3,10 @@ from aiogram.dispatcher import FSMContext, Dispatcher
 import re
 
 from db import (
-    Vacancy,
     User,
     Review,
     get_user_by_id,
     check_if_user_exists,
-    get_vacancy_by_id,
 )
 from keyboards import (
     desc_cb,
@@ -19,12 +17,11 @@ from keyboards import (
     all_tags,
     all_salary_types,
     all_desired_employer_types,
-    vacancy_kb_hide_desc,
-    vacancy_kb_show_desc,
 )
 from SETTINGS import bot, SUPERUSER_TELEGRAM_IDS as STID
 from states import Registration
-from utils.general import strong, get_message_text, prefetch_data
+from utils.general import strong, prefetch_data
+from utils.vacancy_messages import VacancyMessages, vacancy_messages
 
 
 async def help_hendler(message: types.Message):
@@ -209,39 +206,29 @@ async def show_desc_handler(query: types.CallbackQuery, callback_data: dict):
     vacancy_id: str = re.findall(r"ID: \d+", query.message.text)[0]
     vacancy_id: int = int(vacancy_id.split("ID: ")[1])
 
-    vacancy: Vacancy = await get_vacancy_by_id(vacancy_id=vacancy_id)
+    messages: VacancyMessages = await vacancy_messages.get_by_id(vacancy_id)
 
-    try:
-        await bot.edit_message_text(
-            chat_id=query.from_user.id,
-            message_id=query.message.message_id,
-            text=get_message_text(vacancy, show_desc=True),
-            parse_mode=types.ParseMode.HTML,
-            reply_markup=vacancy_kb_hide_desc(vacancy),
-        )
-
-    except:
-        await bot.edit_message_text(
-            chat_id=query.from_user.id,
-            message_id=query.message.message_id,
-            text=get_message_text(vacancy, show_desc=True),
-            parse_mode=types.ParseMode.MARKDOWN,
-            reply_markup=vacancy_kb_hide_desc(vacancy),
-        )
+    await bot.edit_message_text(
+        chat_id=query.from_user.id,
+        message_id=query.message.message_id,
+        text=messages.full.text,
+        parse_mode=types.ParseMode.HTML,
+        reply_markup=messages.full.reply_markup,
+    )
 
 
 async def hide_desc_handler(query: types.CallbackQuery, callback_data: dict):
     vacancy_id: str = re.findall(r"ID: \d+", query.message.text)[0]
     vacancy_id: int = int(vacancy_id.split("ID: ")[1])
 
-    vacancy: Vacancy = await get_vacancy_by_id(vacancy_id=vacancy_id)
+    messages: VacancyMessages = await vacancy_messages.get_by_id(vacancy_id)
 
     await bot.edit_message_text(
-        get_message_text(vacancy),
+        messages.short.text,
         query.from_user.id,
         query.message.message_id,
         parse_mode=types.ParseMode.HTML,
-        reply_markup=vacancy_kb_show_desc(vacancy),
+        reply_markup=messages.short.reply_markup,
     )
 
 
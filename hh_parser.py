@@ -1,13 +1,45 @@
-import aiohttp
 import asyncio
-import re
-
-from db import Vacancy, get_employers_types
-from utils.regex import EMPLOYER_TYPE_REGEX, parse_tags
-from utils.general import edit_description
+import datetime
+import logging
+from typing import AsyncIterator
+
+from db import (
+    Employer,
+    Vacancy,
+    add_vacancies,
+    get_employer_by_id,
+    get_employers_types,
+    get_known_hh_ids,
+    get_watermark,
+    set_watermark,
+)
+from utils.hh_client import HHAPIError, HHClient
+from utils.text_processing import TextPool, VacancyText, is_consulting, text_pool
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://api.hh.ru"
 
+# сколько вакансий обогащается одновременно (на каждую приходится до 3 запросов к API)
+CONCURRENCY_LIMIT = 10
+
+# дисковый кэш ответов hh.ru (None -- без кэша)
+HTTP_CACHE_PATH = "hh_http_cache.sqlite3"
+HTTP_CACHE_MAX_SIZE = 200 * 1024 * 1024  # байт
+
+# hh.ru отдаёт не больше 2000 вакансий по одному поисковому запросу (page * per_page < 2000)
+MAX_SEARCH_DEPTH = 2000
+
+# watermark в таблице crawl_state для основной поисковой выдачи
+CRAWL_NAME = "vacancies"
+
+# запас, с которым date_from отступает назад от watermark: вакансии, которые hh.ru проиндексировал
+# с задержкой, не потеряются, а повторы отсеются через get_known_hh_ids
+WATERMARK_OVERLAP = datetime.timedelta(hours=1)
+
+# через сколько классификация работодателя (Консалтинг/Инхаус) в таблице employers считается устаревшей
+EMPLOYER_TYPE_TTL = datetime.timedelta(days=30)
+
 
 params = {
     "text": "Юрист",
@@ -19,7 +51,9 @@ params = {
     "label": "not_from_agency",
     "per_page": "100",
     "period": "1",  # Подборка за 1 день (за сутки)
-    "order_by": "salary_desc",  # по убыванию дохода
+    # от новых к старым: выдача дочитывается окнами по date_to (iter_search_pages),
+    # а при сортировке по доходу первые MAX_SEARCH_DEPTH вакансий -- не самые свежие
+    "order_by": "publication_time",
 }
 
 
@@ -90,95 +124,389 @@ def shorten_vacancy(vacancy: dict) -> dict:
     return short_vacancy
 
 
-async def add_description(session: aiohttp.ClientSession, short_vacancy: dict) -> dict:
-    async with session.get(f'/vacancies/{short_vacancy["hh_id"]}') as resp:
-        resp = await resp.json()
-        short_vacancy["description"] = edit_description(resp.get("description"))
+class VacancyDetailLoader:
+    """Загружает /vacancies/{id} без дублей: конкурентные запросы одной и той же вакансии
+    ждут один и тот же запрос к API. Запрос забывается, как только завершился,
+    так что в памяти держатся только запросы в полёте, а ошибка не запоминается навсегда
+    """
+
+    def __init__(self, client: HHClient):
+        self.client = client
+        self._details: dict[int, asyncio.Task] = {}
+
+    async def _fetch(self, hh_id: int) -> dict:
+        return await self.client.get_json(f"/vacancies/{hh_id}", endpoint="vacancy")
+
+    async def get(self, hh_id: int) -> dict:
+        task = self._details.get(hh_id)
+
+        if task is None:
+            task = asyncio.create_task(self._fetch(hh_id))
+            task.add_done_callback(lambda _: self._details.pop(hh_id, None))
+            self._details[hh_id] = task
+
+        return await task
+
 
-        return short_vacancy
+async def add_description(loader: VacancyDetailLoader, short_vacancy: dict) -> dict:
+    """Описание и key_skills как есть: чистятся и размечаются они потом пачкой в add_texts"""
+    resp = await loader.get(short_vacancy["hh_id"])
+    short_vacancy["description"] = resp.get("description")
+    short_vacancy["key_skills"] = tuple(
+        skill["name"] for skill in resp.get("key_skills") or []
+    )
+
+    return short_vacancy
+
+
+def classify_employer(consulting: bool, employers_types_as_dict: dict) -> int:
+    """Возвращает id типа работодателя (Консалтинг/Инхаус) по результату
+    utils.text_processing.is_consulting для его описания с hh.ru"""
+    if consulting:
+        return employers_types_as_dict["Консалтинг"]
+    else:
+        # если описания работодателя (description по адресу, который мы запрашиваем) нет в принципе,
+        # то он считается инхаусом т.к. консалтинг в 99% случаев более организованный и заполняет описание о себе
+        # сделал так, чтобы не просить юзеров при регистрации выбирать, показывать ли им
+        # вакансии без описания работодателя
+        return employers_types_as_dict["Инхаус"]
+
+
+class EmployerTypeResolver:
+    """Определяет тип работодателя сначала по таблице employers, и только если записи нет
+    или она старше ttl -- через /employers/{id}. Свежая классификация сохраняется в БД.
+    В рамках одного запуска каждый работодатель проверяется не больше одного раза
+    """
+
+    def __init__(
+        self,
+        client: HHClient,
+        employers_types_as_dict: dict,
+        ttl: datetime.timedelta = EMPLOYER_TYPE_TTL,
+    ):
+        self.client = client
+        self.employers_types_as_dict = employers_types_as_dict
+        self.ttl = ttl
+        self._employer_types: dict[str, asyncio.Task] = {}
+
+    async def _resolve(self, employer_id: str) -> int:
+        employer: Employer or None = await get_employer_by_id(employer_id)
+        if employer and datetime.datetime.now() - employer.fetched_at < self.ttl:
+            return employer.employer_type_id
+
+        resp = await self.client.get_json(
+            f"/employers/{employer_id}", endpoint="employer"
+        )
+
+        employer_type_id = classify_employer(
+            is_consulting(resp.get("description")), self.employers_types_as_dict
+        )
+
+        await Employer(
+            hh_id=employer_id,
+            employer_type_id=employer_type_id,
+            fetched_at=datetime.datetime.now(),
+        ).add_or_update()
+
+        return employer_type_id
+
+    async def get(self, employer_id: str) -> int:
+        if employer_id not in self._employer_types:
+            self._employer_types[employer_id] = asyncio.create_task(
+                self._resolve(employer_id)
+            )
+
+        task: asyncio.Task = self._employer_types[employer_id]
+        try:
+            return await task
+
+        except HHAPIError:
+            # неудачный запрос не запоминается: следующая вакансия этого работодателя спросит hh.ru заново
+            if self._employer_types.get(employer_id) is task:
+                del self._employer_types[employer_id]
+            raise
 
 
 async def add_employer_type(
-    session: aiohttp.ClientSession, short_vacancy: dict, employers_types_as_dict: dict
+    resolver: EmployerTypeResolver, short_vacancy: dict
 ) -> dict:
-    async with session.get(f'/employers/{short_vacancy["employer"]["id"]}') as resp:
-        resp = await resp.json()
-        employer_description = resp.get("description")
-
-        if employer_description:
-            # employers_types_as_dict = await get_employers_types(reverse=True)
-
-            if re.search(EMPLOYER_TYPE_REGEX, employer_description, re.I | re.M | re.S):
-                short_vacancy["employer_type_id"] = employers_types_as_dict[
-                    "Консалтинг"
-                ]
-            else:
-                short_vacancy["employer_type_id"] = employers_types_as_dict["Инхаус"]
-        else:
-            # если описания работодателя (description по адресу, который мы запрашиваем) нет в принципе,
-            # то он считается инхаусом т.к. консалтинг в 99% случаев более организованный и заполняет описание о себе
-            # сделал так, чтобы не просить юзеров при регистрации выбирать, показывать ли им
-            # вакансии без описания работодателя
-            short_vacancy["employer_type_id"] = employers_types_as_dict["Инхаус"]
+    short_vacancy["employer_type_id"] = await resolver.get(
+        short_vacancy["employer"]["id"]
+    )
+
+    return short_vacancy
 
-        return short_vacancy
 
+async def add_texts(pool: TextPool, short_vacancies: list[dict]) -> list[dict]:
+    """Чистит описания и размечает вакансии одной пачкой в пуле процессов,
+    чтобы event loop бота не был занят регулярками, пока идёт парсинг"""
+    processed_texts = await pool.process(
+        VacancyText(short_vacancy["description"], short_vacancy["key_skills"])
+        for short_vacancy in short_vacancies
+    )
 
-async def add_tags(session: aiohttp.ClientSession, short_vacancy: dict) -> dict:
-    async with session.get(f'/vacancies/{short_vacancy["hh_id"]}') as resp:
-        resp = await resp.json()
-        raw_key_skills = resp.get("key_skills")
-        key_skills = [skill["name"] for skill in raw_key_skills if raw_key_skills]
+    for short_vacancy, processed_text in zip(short_vacancies, processed_texts):
+        short_vacancy["description"] = processed_text.description
+        short_vacancy["tags"] = list(processed_text.tags)
+
+    return short_vacancies
+
+
+def make_vacancy(short_vacancy: dict) -> Vacancy:
+    return Vacancy(
+        hh_id=short_vacancy["hh_id"],
+        name=short_vacancy["name"],
+        url=short_vacancy.get("alternate_url"),
+        employer_name=short_vacancy["employer"]["name"],
+        employer_type_id=short_vacancy.get("employer_type_id"),
+        experience_id=1
+        if short_vacancy["experience"] == "noExperience"
+        else 2,  # поменять, если добавятся новые виды опыта
+        salary=short_vacancy.get("salary"),
+        address=short_vacancy.get("address"),
+        metro_stations=short_vacancy.get("metro_stations"),
+        description=short_vacancy["description"],
+        tags=short_vacancy["tags"],
+    )
 
-    found_tags = []
 
-    if raw_key_skills:
-        found_tags.extend(key_skills)
+async def enrich_vacancy(
+    loader: VacancyDetailLoader,
+    resolver: EmployerTypeResolver,
+    semaphore: asyncio.Semaphore,
+    vacancy: dict,
+) -> dict or None:
+    """Обогащает одну вакансию из выдачи данными из API: описание -> тип работодателя.
+    Теги ставятся потом пачкой (add_texts). Возвращает None, если вакансию не нужно сохранять
+    """
+    async with semaphore:
+        short_vacancy = shorten_vacancy(vacancy)
 
-    short_vacancy["tags"] = parse_tags(
-        found_tags=found_tags, description=short_vacancy["description"]
-    )
+        try:
+            short_vacancy = await add_description(loader, short_vacancy)
+
+            # вакансии без описания не обрабатываются
+            if not short_vacancy["description"]:
+                return None
+
+            short_vacancy = await add_employer_type(resolver, short_vacancy)
+
+        # вакансии, которые hh.ru уже снял с публикации, не обрабатываются;
+        # временные ошибки (нет ответа, 429, 5xx после всех повторов) уходят в parse_vacancies,
+        # чтобы watermark не проскочил такую вакансию
+        except HHAPIError as e:
+            if e.retriable:
+                raise
+            return None
 
     return short_vacancy
 
 
-async def parse_vacancies():
-    async with aiohttp.ClientSession(BASE_URL) as session:
-        async with session.get("/vacancies", params=params) as resp:
-            resp = await resp.json()
-            for vacancy in resp["items"]:
-                short_vacancy = shorten_vacancy(vacancy)
-                short_vacancy = await add_description(session, short_vacancy)
-
-                # вакансии без описания не обрабатываются
-                if not short_vacancy["description"]:
-                    continue
-
-                employers_types_as_dict = await get_employers_types(reverse=True)
-                additions = [
-                    add_tags(session, short_vacancy),
-                    add_employer_type(session, short_vacancy, employers_types_as_dict),
-                ]
-                await asyncio.gather(*additions)
-
-                # вакансии, на которые не удалось найти теги, не обрабатываются
-                if not short_vacancy["tags"]:
-                    continue
-
-                new_vacancy = Vacancy(
-                    hh_id=short_vacancy["hh_id"],
-                    name=short_vacancy["name"],
-                    url=short_vacancy.get("alternate_url"),
-                    employer_name=short_vacancy["employer"]["name"],
-                    employer_type_id=short_vacancy.get("employer_type_id"),
-                    experience_id=1
-                    if short_vacancy["experience"] == "noExperience"
-                    else 2,  # поменять, если добавятся новые виды опыта
-                    salary=short_vacancy.get("salary"),
-                    address=short_vacancy.get("address"),
-                    metro_stations=short_vacancy.get("metro_stations"),
-                    description=short_vacancy["description"],
-                    tags=short_vacancy["tags"],
-                )
+async def iter_vacancy_pages(
+    client: HHClient, search_params: dict, prefetch: bool = True
+) -> AsyncIterator[list[dict]]:
+    """Отдаёт items выдачи /vacancies постранично, пока не кончатся pages.
+    При prefetch=True страница N+1 запрашивается, пока обрабатывается страница N"""
+
+    async def fetch_page(page: int) -> dict:
+        return await client.get_json(
+            "/vacancies",
+            endpoint="search",
+            params={**search_params, "page": str(page)},
+        )
+
+    max_pages = MAX_SEARCH_DEPTH // int(search_params["per_page"])
+    page = 0
+    next_page: asyncio.Task = asyncio.create_task(fetch_page(page))
+
+    try:
+        while next_page:
+            resp = await next_page
+            next_page = None
+            has_next_page = page + 1 < min(resp.get("pages", 0), max_pages)
+
+            if has_next_page and prefetch:
+                next_page = asyncio.create_task(fetch_page(page + 1))
+
+            yield resp["items"]
+
+            if has_next_page and not prefetch:
+                next_page = asyncio.create_task(fetch_page(page + 1))
+
+            page += 1
+
+    finally:
+        # если обработку выдачи прервали, не оставляем висеть запрос следующей страницы
+        if next_page:
+            next_page.cancel()
+
 
-                await new_vacancy.add()
+def parse_published_at(vacancy: dict) -> datetime.datetime:
+    # формат hh.ru: 2023-06-01T12:34:56+0300
+    return datetime.datetime.strptime(vacancy["published_at"], "%Y-%m-%dT%H:%M:%S%z")
+
+
+async def iter_search_pages(
+    client: HHClient, search_params: dict
+) -> AsyncIterator[list[dict]]:
+    """Вся выдача по search_params постранично, от новых вакансий к старым.
+    hh.ru отдаёт не больше MAX_SEARCH_DEPTH вакансий на запрос, поэтому если их нашлось больше,
+    выдача дочитывается следующими запросами с date_to = published_at самой старой из полученных
+    (вакансии на границе окон придут дважды, повтор отсеется через get_known_hh_ids)"""
+    search_params = dict(search_params)
+
+    while True:
+        walked, oldest = 0, None
+
+        async for vacancies in iter_vacancy_pages(client, search_params):
+            walked += len(vacancies)
+            for vacancy in vacancies:
+                published_at = parse_published_at(vacancy)
+                if not oldest or published_at < oldest:
+                    oldest = published_at
+
+            yield vacancies
+
+        if walked < MAX_SEARCH_DEPTH or not oldest:
+            return
+
+        date_to = oldest.isoformat()
+        if search_params.get("date_to") == date_to:
+            # больше MAX_SEARCH_DEPTH вакансий, опубликованных в одну секунду: окно дальше не сужается
+            logger.warning("Выдача hh.ru до %s прочитана не целиком", date_to)
+            return
+
+        search_params["date_to"] = date_to
+
+
+def get_search_params(
+    watermark: datetime.datetime or None, now: datetime.datetime = None
+) -> dict:
+    """Параметры поиска с date_from от watermark прошлого запуска.
+    Без watermark (первый запуск) ищем за period, как раньше"""
+    search_params = dict(params)
+
+    # hh.ru не принимает period вместе с date_from/date_to, а date_to нужен iter_search_pages
+    period = search_params.pop("period", None)
+
+    if watermark:
+        search_params["date_from"] = (watermark - WATERMARK_OVERLAP).isoformat()
+    elif period:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        search_params["date_from"] = (
+            now - datetime.timedelta(days=int(period))
+        ).isoformat()
+
+    return search_params
+
+
+def next_watermark(
+    newest: datetime.datetime or None, earliest_failed: datetime.datetime or None
+) -> datetime.datetime or None:
+    """watermark после запуска: published_at самой свежей из обработанных вакансий,
+    но строго раньше самой ранней вакансии, которую не удалось обработать из-за временной ошибки,
+    чтобы следующий запуск её перечитал"""
+    if earliest_failed and (not newest or earliest_failed <= newest):
+        return earliest_failed - datetime.timedelta(seconds=1)
+
+    return newest
+
+
+# общий клиент hh.ru на всё приложение, открывается и закрывается в app.on_startup/on_shutdown
+hh_client = HHClient(
+    BASE_URL, cache_path=HTTP_CACHE_PATH, cache_max_size=HTTP_CACHE_MAX_SIZE
+)
+
+
+async def parse_vacancies(
+    client: HHClient = hh_client,
+    concurrency_limit: int = CONCURRENCY_LIMIT,
+    pool: TextPool = text_pool,
+):
+    """Обогащает вакансии из выдачи постранично и конкурентно (не больше concurrency_limit вакансий
+    одновременно), а сохраняет в БД в том же порядке, в каком их отдал hh.ru.
+    Вакансии, которые уже есть в БД, отсеиваются до запросов их описаний и работодателей,
+    а описания страницы чистятся и размечаются одной пачкой в пуле процессов (pool).
+    Каждая страница сохраняется одним запросом (add_vacancies).
+
+    Возвращает hh_id вакансий, которые были сохранены впервые. До рассылки новые вакансии
+    доходят сами: они сохраняются неотправленными и попадают в iter_unsent_vacancies
+    """
+    semaphore = asyncio.Semaphore(concurrency_limit)
+    search_params = get_search_params(await get_watermark(CRAWL_NAME))
+
+    # описания вакансий живут только в рамках одного запуска
+    loader = VacancyDetailLoader(client)
+
+    employers_types_as_dict = await get_employers_types(reverse=True)
+    resolver = EmployerTypeResolver(client, employers_types_as_dict)
+
+    new_hh_ids: set[int] = set()
+
+    # самая свежая из вакансий выдачи и самая ранняя из тех, что не удалось обработать (временная ошибка hh.ru)
+    newest: datetime.datetime or None = None
+    earliest_failed: datetime.datetime or None = None
+
+    async for vacancies in iter_search_pages(client, search_params):
+        for vacancy in vacancies:
+            published_at = parse_published_at(vacancy)
+            if not newest or published_at > newest:
+                newest = published_at
+
+        known_hh_ids: set[int] = await get_known_hh_ids(
+            [int(vacancy["id"]) for vacancy in vacancies]
+        )
+        vacancies = [
+            vacancy for vacancy in vacancies if int(vacancy["id"]) not in known_hh_ids
+        ]
+
+        # asyncio.gather возвращает результаты в порядке переданных корутин
+        results = await asyncio.gather(
+            *[
+                enrich_vacancy(loader, resolver, semaphore, vacancy)
+                for vacancy in vacancies
+            ],
+            return_exceptions=True,
+        )
+
+        short_vacancies = []
+        for vacancy, result in zip(vacancies, results):
+            if isinstance(result, HHAPIError):
+                published_at = parse_published_at(vacancy)
+                if not earliest_failed or published_at < earliest_failed:
+                    earliest_failed = published_at
+            elif isinstance(result, Exception):
+                # ошибка не временная (например, в выдаче пришла вакансия без нужного поля):
+                # повтор её не исправит, поэтому вакансия пропускается, а не останавливает весь обход
+                logger.error(
+                    "Вакансия %s пропущена", vacancy.get("id"), exc_info=result
+                )
+            elif isinstance(result, BaseException):
+                raise result
+            elif result:
+                short_vacancies.append(result)
+
+        short_vacancies = await add_texts(pool, short_vacancies)
+
+        # вакансии, на которые не удалось найти теги, не обрабатываются;
+        # порядок в пачке тот же, в каком вакансии отдал hh.ru
+        new_hh_ids |= await add_vacancies(
+            [
+                make_vacancy(short_vacancy)
+                for short_vacancy in short_vacancies
+                if short_vacancy["description"] and short_vacancy["tags"]
+            ]
+        )
+
+    # watermark двигается только после того, как выдача обработана целиком,
+    # и не дальше вакансий, которые придётся перечитать
+    watermark = next_watermark(newest, earliest_failed)
+    if watermark:
+        if earliest_failed:
+            logger.warning(
+                "Не удалось обработать часть вакансий, следующий запуск начнёт с %s",
+                watermark,
+            )
+        await set_watermark(CRAWL_NAME, watermark)
+
+    return new_hh_ids
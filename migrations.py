@@ -0,0 +1,113 @@
+"""Версионные миграции схемы: всё, чего не делает Base.metadata.create_all.
+
+create_all создаёт только недостающие таблицы, а индексы и колонки в уже существующих таблицах не трогает.
+Миграции применяются по порядку в Base.start() сразу после create_all, в той же транзакции,
+а версия последней применённой миграции записывается в schema_version.
+Новая миграция -- новый элемент в конце MIGRATIONS со следующим номером; уже применённые не меняются.
+"""
+
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# ключ pg_advisory_xact_lock: два процесса бота не применяют миграции одновременно
+MIGRATIONS_LOCK_ID = 20_240_022
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+MIGRATIONS = [
+    Migration(
+        version=1,
+        description="GIN-индексы по тегам пользователей и вакансий",
+        statements=(
+            # User.tags.overlap(Vacancy.tags) в vacancy_matches_query
+            "CREATE INDEX IF NOT EXISTS ix_users_tags ON users USING gin (tags)",
+            "CREATE INDEX IF NOT EXISTS ix_vacancies_tags ON vacancies USING gin (tags)",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="Частичный индекс неотправленных вакансий",
+        statements=(
+            # условие то же, что в unsent_vacancies_query: иначе планировщик индекс не возьмёт
+            "CREATE INDEX IF NOT EXISTS ix_vacancies_unsent ON vacancies (hh_id) "
+            "WHERE is_sent = false",
+        ),
+    ),
+    Migration(
+        version=3,
+        description="Частичный индекс неразрешённых отзывов",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_reviews_unresolved ON reviews (id) "
+            "WHERE resolved IS NULL",
+        ),
+    ),
+    Migration(
+        version=4,
+        description="Колонки salary_from/salary_to вместо JSON salary для подбора",
+        statements=(
+            "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS salary_from integer",
+            "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS salary_to integer",
+            # то же, что db.salary_bounds: 0 и отсутствующая граница -- NULL
+            "UPDATE vacancies SET "
+            "salary_from = nullif((salary ->> 'from')::numeric, 0)::integer, "
+            "salary_to = nullif((salary ->> 'to')::numeric, 0)::integer "
+            "WHERE salary IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS ix_vacancies_salary ON vacancies (salary_to, salary_from)",
+        ),
+    ),
+]
+
+
+async def get_schema_version(conn: AsyncConnection) -> int:
+    """Версия последней применённой миграции, 0 -- если миграций ещё не было"""
+    version = await conn.execute(
+        text("SELECT coalesce(max(version), 0) FROM schema_version")
+    )
+
+    return version.scalar_one()
+
+
+async def apply_migrations(
+    conn: AsyncConnection, migrations: list[Migration] = MIGRATIONS
+) -> list[int]:
+    """Применяет ещё не применённые миграции в транзакции conn и возвращает их версии"""
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_id)"),
+        {"lock_id": MIGRATIONS_LOCK_ID},
+    )
+    await conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version integer PRIMARY KEY, "
+            "description varchar NOT NULL, "
+            "applied_at timestamp with time zone NOT NULL DEFAULT now())"
+        )
+    )
+
+    current_version = await get_schema_version(conn)
+    applied_versions = []
+
+    for migration in sorted(migrations, key=lambda migration: migration.version):
+        if migration.version <= current_version:
+            continue
+
+        for statement in migration.statements:
+            await conn.execute(text(statement))
+
+        await conn.execute(
+            text(
+                "INSERT INTO schema_version (version, description) "
+                "VALUES (:version, :description)"
+            ),
+            {"version": migration.version, "description": migration.description},
+        )
+        applied_versions.append(migration.version)
+
+    return applied_versions
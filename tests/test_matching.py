@@ -0,0 +1,213 @@
+"""Подбор получателей для админской рассылки (SubscriberIndex.match без get_finished_recipients)
+должен совпадать с vacancy_matches_query, по которому идёт ночная рассылка.
+
+Нужна PostgreSQL из SETTINGS. Таблицы создаются и заполняются в транзакции, которая в конце
+откатывается. У тестовых строк отрицательные id, чтобы не пересечься с данными бота.
+"""
+
+import asyncio
+import random
+
+import pytest
+from sqlalchemy.dialects.postgresql import insert
+
+import db
+from db import (
+    DELIVERY_FAILED,
+    DELIVERY_MAX_ATTEMPTS,
+    DELIVERY_SENT,
+    Base,
+    Delivery,
+    Employer_Type,
+    Experience,
+    SubscriberIndex,
+    User,
+    Vacancy,
+    finished_recipients_query,
+    vacancy_as_row,
+    vacancy_matches_query,
+)
+from utils.regex import TAG_CATEGORIES
+
+EMPLOYER_TYPES = {-1: "Консалтинг (тест)", -2: "Инхаус (тест)"}
+EXPERIENCE_TYPES = {-1: "Нет опыта (тест)", -2: "От 1 до 3 лет (тест)"}
+TAGS = [tag_name for _, tag_name, _ in TAG_CATEGORIES]
+SALARIES = [30_000, 60_000, 100_000, 150_000, 250_000]
+# границы зарплаты вакансии: None и 0 -- граница не указана
+SALARY_BOUNDS = [None, 0, 60_000, 100_000, 149_999, 200_000]
+
+
+def make_users(rng: random.Random, count: int) -> list[User]:
+    return [
+        User(
+            telegram_id=-telegram_id,
+            username=f"user{telegram_id}",
+            experience_id=rng.choice(list(EXPERIENCE_TYPES)),
+            salary=rng.choice(SALARIES),
+            tags=rng.sample(TAGS, rng.randint(0, 3)),
+            desired_employer_type_names=rng.sample(
+                list(EMPLOYER_TYPES.values()), rng.randint(0, 2)
+            ),
+        )
+        for telegram_id in range(1, count + 1)
+    ]
+
+
+def make_vacancies(rng: random.Random, count: int) -> list[Vacancy]:
+    vacancies = []
+
+    for hh_id in range(1, count + 1):
+        salary_from, salary_to = rng.choice(SALARY_BOUNDS), rng.choice(SALARY_BOUNDS)
+        salary = rng.choice([None, {"from": salary_from, "to": salary_to}])
+
+        vacancies.append(
+            Vacancy(
+                hh_id=-hh_id,
+                name=f"Юрист {hh_id}",
+                employer_name="Работодатель",
+                employer_type_id=rng.choice(list(EMPLOYER_TYPES) + [None]),
+                experience_id=rng.choice(list(EXPERIENCE_TYPES)),
+                salary=salary,
+                tags=rng.sample(TAGS, rng.randint(0, 3)),
+                description="Описание",
+            )
+        )
+
+    return vacancies
+
+
+def make_deliveries(
+    rng: random.Random, users: list[User], vacancies: list[Vacancy], count: int
+) -> list[dict]:
+    pairs = rng.sample(
+        [(vacancy.hh_id, user.telegram_id) for vacancy in vacancies for user in users],
+        count,
+    )
+
+    return [
+        {
+            "vacancy_id": hh_id,
+            "telegram_id": telegram_id,
+            "status": rng.choice([DELIVERY_SENT, DELIVERY_FAILED]),
+            "attempt": rng.randint(1, DELIVERY_MAX_ATTEMPTS),
+        }
+        for hh_id, telegram_id in pairs
+    ]
+
+
+async def match_in_db(
+    users: list[User], vacancies: list[Vacancy], deliveries: list[dict]
+) -> tuple[dict[int, set[int]], dict[int, set[int]]]:
+    """(пары из vacancy_matches_query, получатели из finished_recipients_query) по hh_id"""
+    hh_ids = [vacancy.hh_id for vacancy in vacancies]
+    matches = {hh_id: set() for hh_id in hh_ids}
+    finished = {}
+
+    async with db.engine.connect() as conn:
+        transaction = await conn.begin()
+
+        try:
+            await conn.run_sync(Base.metadata.create_all)
+
+            for model, names_by_id in (
+                (Employer_Type, EMPLOYER_TYPES),
+                (Experience, EXPERIENCE_TYPES),
+            ):
+                await conn.execute(
+                    insert(model)
+                    .values(
+                        [{"id": id, "name": name} for id, name in names_by_id.items()]
+                    )
+                    .on_conflict_do_nothing()
+                )
+
+            await conn.execute(
+                insert(User).values(
+                    [
+                        {
+                            "telegram_id": user.telegram_id,
+                            "username": user.username,
+                            "experience_id": user.experience_id,
+                            "salary": user.salary,
+                            "tags": user.tags,
+                            "desired_employer_type_names": user.desired_employer_type_names,
+                        }
+                        for user in users
+                    ]
+                )
+            )
+            await conn.execute(
+                insert(Vacancy).values(
+                    [vacancy_as_row(vacancy) for vacancy in vacancies]
+                )
+            )
+            await conn.execute(insert(Delivery).values(deliveries))
+
+            for hh_id, telegram_id in await conn.execute(vacancy_matches_query(hh_ids)):
+                matches[hh_id].add(telegram_id)
+
+            for hh_id in hh_ids:
+                result = await conn.execute(finished_recipients_query(hh_id))
+                finished[hh_id] = set(result.scalars())
+
+        finally:
+            await transaction.rollback()
+
+    return matches, finished
+
+
+async def match_in_memory(
+    users: list[User], vacancies: list[Vacancy]
+) -> dict[int, set[int]]:
+    index = SubscriberIndex()
+    # без load(): индекс заполняется только тестовыми пользователями
+    index._loaded = True
+    for user in users:
+        index.update(user)
+
+    return {vacancy.hh_id: await index.match(vacancy) for vacancy in vacancies}
+
+
+async def run_both(seed: int):
+    rng = random.Random(seed)
+    users = make_users(rng, 150)
+    vacancies = make_vacancies(rng, 60)
+    deliveries = make_deliveries(rng, users, vacancies, 400)
+
+    try:
+        async with db.engine.connect():
+            pass
+    except Exception as e:
+        await db.engine.dispose()
+        pytest.skip(f"нет PostgreSQL из SETTINGS: {e!r}")
+
+    try:
+        db_matches, finished = await match_in_db(users, vacancies, deliveries)
+    finally:
+        await db.engine.dispose()
+
+    memory_matches = await match_in_memory(users, vacancies)
+
+    return db_matches, finished, memory_matches
+
+
+@pytest.fixture
+def employers_types(monkeypatch):
+    async def get_employers_types(reverse: bool = False) -> dict:
+        if reverse:
+            return {name: id for id, name in EMPLOYER_TYPES.items()}
+        return dict(EMPLOYER_TYPES)
+
+    monkeypatch.setattr(db, "get_employers_types", get_employers_types)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_subscriber_index_matches_query(employers_types, seed: int):
+    db_matches, finished, memory_matches = asyncio.run(run_both(seed))
+
+    # данные не вырождены: есть и подходящие пары, и отсеянные журналом
+    assert any(db_matches.values())
+    assert any(memory_matches[hh_id] & finished[hh_id] for hh_id in finished)
+
+    for hh_id, telegram_ids in db_matches.items():
+        assert memory_matches[hh_id] - finished[hh_id] == telegram_ids, hh_id
@@ -0,0 +1,181 @@
+"""Разметка по отраслям должна совпадать с исходным parse_tags (до перехода на TAGS_PATTERN)
+на размеченном корпусе benchmarks/fixtures/tagging_corpus.json, а словарь основ (backend="stems") --
+размечать так же, как регулярные выражения, вместе с их особенностями."""
+
+import random
+import re
+
+import pytest
+
+from benchmarks.fake_hh_api import load_fixture
+from benchmarks.tagging_bench import (
+    BACKENDS,
+    MAX_ACCURACY_DROP,
+    find_regressions,
+    load_baseline,
+    load_corpus,
+    measure_accuracy,
+)
+from utils.regex import (
+    CIVIL_TAGS_REGEX,
+    CORPORATE_TAGS_REGEX,
+    DP_TAGS_REGEX,
+    DR_TAGS_REGEX,
+    IP_TAGS_REGEX,
+    TAG_CATEGORIES,
+    parse_tags,
+)
+from utils.stem_tagger import stem_tagger
+from utils.tagger import tag_vacancy
+from utils.telegram_html import render_description
+
+CORPUS = load_fixture("tagging_corpus.json")
+
+
+def baseline_parse_tags(description: str, found_tags: list) -> list or None:
+    """parse_tags в том виде, в каком он был до TAGS_PATTERN (без изменяемого аргумента по умолчанию)"""
+    found_tags = list(found_tags)
+    pattern = r"|".join(
+        [
+            CORPORATE_TAGS_REGEX,
+            IP_TAGS_REGEX,
+            DP_TAGS_REGEX,
+            DR_TAGS_REGEX,
+            CIVIL_TAGS_REGEX,
+        ]
+    )
+
+    found_tags.extend(
+        re.findall(pattern=pattern, string=description, flags=re.I | re.M | re.S)
+    )
+
+    found_tags_as_str = " ".join(found_tags)
+
+    parsed_tags = [
+        tag_name
+        for _, tag_name, regex in TAG_CATEGORIES
+        if re.search(regex, found_tags_as_str, re.I | re.M | re.S)
+    ]
+
+    return parsed_tags or None
+
+
+@pytest.mark.parametrize("vacancy", CORPUS["vacancies"])
+def test_parse_tags_matches_baseline(vacancy: dict):
+    for description in (
+        vacancy["description"],
+        render_description(vacancy["description"]),
+    ):
+        assert parse_tags(description, vacancy["key_skills"]) == baseline_parse_tags(
+            description, vacancy["key_skills"]
+        )
+
+
+@pytest.mark.parametrize(
+    "key_skills",
+    [
+        ["Кредиторская задолженность"],
+        ["Работа с кредиторами"],
+        ["Договоры поставки", "Кредиторская задолженность"],
+    ],
+)
+def test_key_skill_gets_every_category(key_skills: list[str]):
+    assert parse_tags("", key_skills) == baseline_parse_tags("", key_skills)
+    assert parse_tags("", key_skills)[:2] == [
+        "Корпоративное право",
+        "Разрешение споров",
+    ]
+
+
+@pytest.mark.parametrize("vacancy", CORPUS["vacancies"])
+def test_tag_vacancy_matches_baseline(vacancy: dict):
+    description = render_description(vacancy["description"])
+    tags = tag_vacancy(description, key_skills=vacancy["key_skills"]).tags
+
+    assert list(tags) == (baseline_parse_tags(description, vacancy["key_skills"]) or [])
+
+
+@pytest.mark.parametrize("vacancy", CORPUS["vacancies"])
+def test_stems_match_regex(vacancy: dict):
+    for description in (
+        vacancy["description"],
+        render_description(vacancy["description"]),
+    ):
+        assert tag_vacancy(
+            description, vacancy["key_skills"], backend="stems"
+        ) == tag_vacancy(description, vacancy["key_skills"], backend="regex")
+
+
+# особенности выражений utils/regex.py, которые словарь основ повторяет: (текст, ожидаемые отрасли)
+REGEX_QUIRKS = [
+    # [(Арбитражн.{0,4})|(Третейск.{0,4})]суд -- символьный класс: любой из символов и сразу "суд"
+    ("выдача ссуды", ["Разрешение споров"]),
+    ("арбитражный суд", []),
+    ("(компания", ["Корпоративное право"]),
+    ("учреждение компании", []),
+    ("подпроцесс", ["Разрешение споров"]),
+    # Персональн{0,4}данн и Разрешен{0,4}спор -- без пробела между словами
+    ("персональные данные", []),
+    ("персональнданные", ["Персональные данные"]),
+    ("разрешение споров", []),
+    ("разрешенспоров", ["Разрешение споров"]),
+    ("программы для ЭВМ", []),
+    ("программы дляЭВМ", ["Интеллектуальная собственность"]),
+    # [\s,]+ вокруг коротких основ: разделители входят в совпадение
+    ("акционер АО, ООО", ["Корпоративное право"]),
+    ("ПАО", []),
+    ("АО.", []),
+    ("«Иск»", []),
+    ("подача иска", ["Разрешение споров"]),
+    ("решение единственного участника", ["Корпоративное право"]),
+    ("решенединственного участника", []),
+    # ё и е различаются, если в выражении нет [её]
+    ("заём", []),
+    ("платёжеспособность", ["Разрешение споров"]),
+    ("в упрощённом производстве", ["Разрешение споров"]),
+    ("упрощённое производство", []),
+]
+
+
+@pytest.mark.parametrize("backend", ["regex", "stems"])
+@pytest.mark.parametrize("description, tag_names", REGEX_QUIRKS)
+def test_regex_quirks(description: str, tag_names: list[str], backend: str):
+    assert list(tag_vacancy(description, backend=backend).tags) == tag_names
+
+
+# куски, из которых собираются случайные тексты: основы словаря, их обрывки и разделители
+STEMS = sorted({stem.text for phrase in stem_tagger.phrases for stem in phrase.stems})
+PIECES = STEMS + [" ", ",", "\n", ", ", "н", "нн", "ё", ".", "(", "ого ", "и "]
+
+
+def random_text(rng: random.Random) -> str:
+    text = "".join(
+        rng.choice(PIECES) if rng.random() < 0.8 else rng.choice(STEMS)[:3]
+        for _ in range(rng.randint(1, 25))
+    )
+    return text.upper() if rng.random() < 0.2 else text
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_stems_match_regex_on_random_texts(seed: int):
+    rng = random.Random(seed)
+
+    for _ in range(200):
+        description = random_text(rng)
+        key_skills = [random_text(rng) for _ in range(rng.randint(0, 2))]
+
+        assert tag_vacancy(description, key_skills, backend="stems") == tag_vacancy(
+            description, key_skills, backend="regex"
+        ), (description, key_skills)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_accuracy_not_below_baseline(backend: str):
+    """Точностная часть benchmarks.tagging_bench: скорость в pytest не мерится"""
+    baseline: dict = load_baseline()[backend]
+    report = {
+        "throughput": {},
+        "accuracy": measure_accuracy(load_corpus(), BACKENDS[backend]),
+    }
+
+    assert find_regressions(report, baseline, 0.0, MAX_ACCURACY_DROP) == []
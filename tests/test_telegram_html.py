@@ -0,0 +1,162 @@
+"""render_description должен отдавать только то, что Telegram примет с parse_mode=HTML:
+поддерживаемые теги, закрытые в правильном порядке, и экранированный текст -- в том числе
+после обрезки по max_length и при повторном рендере уже отрендеренного описания."""
+
+import random
+import re
+
+import pytest
+
+from benchmarks.fake_hh_api import load_fixture
+from utils.general import DESCRIPTION_MAX_LENGTH
+from utils.telegram_html import ELLIPSIS, render_description
+
+CORPUS = load_fixture("tagging_corpus.json")
+
+# всё, что Telegram понимает в parse_mode=HTML из того, что выдаёт рендер
+TELEGRAM_TAG_PATTERN = re.compile(r'<(/?)(b|i|u|s|code|pre|a)( href="[^"<>]*")?>')
+ENTITY_PATTERN = re.compile(r"&(?:amp|lt|gt|quot|#x27);")
+
+# куски HTML hh.ru, из которых собираются случайные описания
+FRAGMENTS = [
+    "<p>",
+    "</p>",
+    "<strong>",
+    "</strong>",
+    "<b>",
+    "</b>",
+    "<em>",
+    "</em>",
+    "<i>",
+    "</i>",
+    "<ul>",
+    "</ul>",
+    "<ol>",
+    "</ol>",
+    "<li>",
+    "</li>",
+    "<h2>",
+    "</h2>",
+    "<br />",
+    "<code>",
+    "</code>",
+    "<pre>",
+    "</pre>",
+    '<a href="https://hh.ru/?a=1&amp;b=2">',
+    '<a href="javascript:alert(1)">',
+    "</a>",
+    '<span class="x">',
+    "</span>",
+    "<script>alert('<b>')</script>",
+    "<!-- комментарий -->",
+    "Юрист по корпоративному праву",
+    " опыт от 3 лет ",
+    "A < B & C > D",
+    "&lt;тег&gt; &amp; &quot;кавычки&quot; &nbsp;",
+    "1 < 2",
+    "\n\n  ",
+]
+
+
+def assert_telegram_html(text: str):
+    """Теги -- только поддерживаемые Telegram и сбалансированные, остальные <, > и & экранированы"""
+    open_tags = []
+    position = 0
+
+    for tag_match in TELEGRAM_TAG_PATTERN.finditer(text):
+        plain = text[position : tag_match.start()]
+        assert "<" not in plain and ">" not in plain, plain
+        assert "&" not in ENTITY_PATTERN.sub("", plain), plain
+        position = tag_match.end()
+
+        closing, tag, _ = tag_match.groups()
+        if closing:
+            assert open_tags and open_tags[-1] == tag, (tag, open_tags)
+            open_tags.pop()
+        else:
+            assert tag not in open_tags, (tag, open_tags)
+            # внутри code и pre Telegram другой разметки не разрешает
+            assert not set(open_tags) & {"code", "pre"}, (tag, open_tags)
+            open_tags.append(tag)
+
+    plain = text[position:]
+    assert "<" not in plain and ">" not in plain, plain
+    assert "&" not in ENTITY_PATTERN.sub("", plain), plain
+    assert not open_tags, open_tags
+
+
+def visible_text(text: str) -> str:
+    return TELEGRAM_TAG_PATTERN.sub("", text)
+
+
+def random_description(rng: random.Random) -> str:
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 300)))
+
+
+DESCRIPTIONS = [vacancy["description"] for vacancy in CORPUS["vacancies"]] + [
+    random_description(random.Random(seed)) for seed in range(200)
+]
+
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+def test_render_is_valid_telegram_html(description: str):
+    assert_telegram_html(render_description(description))
+
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+def test_truncated_render_is_valid_telegram_html(description: str):
+    # короткие max_length обрезают посреди тегов и сущностей чаще, чем реальные 3900
+    for max_length in (5, 40, 200, DESCRIPTION_MAX_LENGTH):
+        rendered = render_description(description, max_length=max_length)
+        assert_telegram_html(rendered)
+
+        # сущность (&lt; и т.п.) -- один видимый символ, и разрезать её обрезка не может
+        visible = re.sub(r"&[a-z#0-9]+;", "_", visible_text(rendered))
+        assert len(visible) <= max_length + len(ELLIPSIS)
+
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+def test_rerender_is_idempotent(description: str):
+    rendered = render_description(description)
+
+    assert render_description(rendered, keep_whitespace=True) == rendered
+
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+def test_rerender_truncates_valid_telegram_html(description: str):
+    """Так обрезается описание в get_message_text: повторным рендером уже отрендеренного"""
+    rendered = render_description(description)
+
+    assert_telegram_html(
+        render_description(rendered, max_length=40, keep_whitespace=True)
+    )
+
+
+def test_text_is_escaped():
+    assert render_description("<p>A < B & C > D</p>") == "A &lt; B &amp; C &gt; D"
+    assert (
+        render_description("&lt;b&gt;не тег&lt;/b&gt;") == "&lt;b&gt;не тег&lt;/b&gt;"
+    )
+
+
+def test_unsupported_links_are_dropped():
+    assert render_description('<a href="javascript:alert(1)">ссылка</a>') == "ссылка"
+    assert render_description("<a>без адреса</a>") == "без адреса"
+    assert (
+        render_description('<a href="https://hh.ru/?a=1&amp;b=&quot;2&quot;">hh</a>')
+        == '<a href="https://hh.ru/?a=1&amp;b=&quot;2&quot;">hh</a>'
+    )
+
+
+def test_unclosed_and_misnested_tags_are_balanced():
+    assert render_description("<b>жирный <i>курсив</b> текст</i>") == (
+        "<b>жирный <i>курсив</i></b> текст"
+    )
+    assert render_description("<strong><em>не закрыт") == "<b><i>не закрыт</i></b>"
+
+
+def test_truncation_closes_open_tags():
+    rendered = render_description("<p><b>" + "слово " * 100 + "</b></p>", max_length=20)
+
+    assert rendered.startswith("<b>") and rendered.endswith(ELLIPSIS + "</b>")
+    assert_telegram_html(rendered)
@@ -1,10 +1,14 @@
 from aiogram import types
 import functools
-import re
+import html
 from typing import Union
 
 from db import User, Vacancy, get_user_by_id
 from SETTINGS import SUPERUSER_TELEGRAM_IDS as STID
+from utils.telegram_html import render_description
+
+# сколько символов описания показывать в сообщении (у Telegram лимит 4096 на всё сообщение)
+DESCRIPTION_MAX_LENGTH = 3900
 
 
 def strong(text: str):
@@ -13,7 +17,7 @@ def strong(text: str):
 
 def get_message_text(vacancy: Vacancy, show_desc: bool = False) -> str:
     text: list[str] = [
-        f"{strong(vacancy.name)} | {vacancy.employer_name}",
+        f"{strong(html.escape(vacancy.name))} | {html.escape(vacancy.employer_name)}",
         f'{strong("Отрасли")}: {", ".join([tag for tag in vacancy.tags])}',
     ]
 
@@ -28,10 +32,16 @@ def get_message_text(vacancy: Vacancy, show_desc: bool = False) -> str:
             text.append(f"💵 {fr} - {to}")
 
     if show_desc:
-        if len(vacancy.description) <= 3900:
-            text.append(f"{vacancy.description}")
-        else:
-            text.append(f"{vacancy.description[:3901]} ...")
+        # описания с hh.ru уже отрендерены парсером, а описания от админа -- обычный текст:
+        # повторный рендер ничего не меняет у первых, экранирует вторые и обрезает их,
+        # не разрывая теги
+        text.append(
+            render_description(
+                vacancy.description,
+                max_length=DESCRIPTION_MAX_LENGTH,
+                keep_whitespace=True,
+            )
+        )
 
     text.append(f"\nID: {vacancy.hh_id}")
 
@@ -41,26 +51,6 @@ def get_message_text(vacancy: Vacancy, show_desc: bool = False) -> str:
     return "\n".join(text)
 
 
-def edit_description(description: Union[str, None]) -> str:
-    if description == None:
-        return None
-
-    description = re.sub(
-        pattern=r"(?P<w1>Требования|Условия)", repl=r"\n\n\g<w1>", string=description
-    )
-    description = re.sub(pattern=r"<li>", repl="\n   • ", string=description)
-    description = re.sub(
-        pattern=r"<p>|<br\s{0,1}/{0,1}>", repl="\n", string=description
-    )
-    description = re.sub(
-        pattern=r"</{0,1}ul{0,1}>|</{0,1}ol{0,1}>|</li>|</\s{0,1}br>|</p>|&quot;",
-        repl="",
-        string=description,
-    )
-
-    return description
-
-
 def prefetch_data(
     data: dict, element_name: str, element_value: Union[int, str, bool]
 ) -> dict:
@@ -0,0 +1,297 @@
+import aiohttp
+import asyncio
+import datetime
+import email.utils
+import importlib.util
+import json
+import logging
+import random
+import time
+
+from utils.http_cache import CachedResponse, HTTPCache
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# aiohttp сам распаковывает br, если установлен brotli
+if importlib.util.find_spec("brotli") is not None:
+    ACCEPT_ENCODING = "gzip, deflate, br"
+else:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+logger = logging.getLogger(__name__)
+
+# запросов в секунду на каждый вид эндпоинта hh.ru
+DEFAULT_BUDGETS = {
+    "search": 2.0,  # /vacancies
+    "vacancy": 5.0,  # /vacancies/{id}
+    "employer": 3.0,  # /employers/{id}
+}
+
+# ответы каких эндпоинтов кэшируются: у страниц поиска в параметрах date_from от водяного знака,
+# они не повторяются от запуска к запуску и только вытесняли бы из кэша вакансии и работодателей
+CACHEABLE_ENDPOINTS = ("vacancy", "employer")
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5  # секунд
+BACKOFF_CAP = 30.0  # секунд
+
+# настройки пула соединений
+LIMIT_PER_HOST = 20
+DNS_CACHE_TTL = 300  # секунд
+KEEPALIVE_TIMEOUT = 60  # секунд
+REQUEST_TIMEOUT = 30  # секунд
+
+
+class HHAPIError(Exception):
+    """Запрос к api.hh.ru не удался (в т.ч. после всех повторных попыток)"""
+
+    def __init__(self, path: str, status: int or None, message: str = ""):
+        self.path = path
+        self.status = status
+        super().__init__(f"{path}: {status or 'нет ответа'} {message}".strip())
+
+    @property
+    def retriable(self) -> bool:
+        """Ошибка временная (нет ответа, 429, 5xx): тот же запрос позже может пройти.
+        Остальные 4xx (например, 404 у снятой вакансии) повторять бессмысленно"""
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов к одному виду эндпоинтов.
+    - rate токенов в секунду, не больше capacity накопленных токенов
+    - на 429 скорость падает вдвое (но не ниже min_rate), а с Retry-After бакет ещё и встаёт на паузу
+    - каждый успешный ответ понемногу возвращает скорость к изначальной
+    """
+
+    def __init__(self, rate: float, capacity: float = None, min_rate: float = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 10
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttle(self, retry_after: float or None = None):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+        # токены снова копятся только с конца паузы, иначе после неё ушла бы пачка запросов
+        # прямо в сервер, который только что ответил 429
+        self.updated = max(time.monotonic(), self.paused_until)
+
+    def succeed(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def parse_retry_after(value: str or None) -> float or None:
+    """Retry-After бывает как числом секунд, так и HTTP-датой"""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(
+        0.0,
+        (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(),
+    )
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP):
+    """Экспоненциальная задержка с "full jitter": случайно от 0 до min(cap, base * 2^attempt)"""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class HHClient:
+    """Долгоживущий клиент api.hh.ru, один на всё приложение: открывается в on_startup (start),
+    закрывается в on_shutdown (close), а для скриптов работает как async with HHClient(...)
+    - все запросы идут через одну aiohttp.ClientSession с пулом keep-alive соединений и кэшем DNS
+    - ответы просим сжатыми (gzip, а если установлен brotli -- ещё и br), JSON разбираем через orjson, если он есть
+    - у search, vacancy и employer запросов свои бюджеты (TokenBucket)
+    - 429, 5xx и сетевые ошибки повторяются до max_retries раз с экспоненциальной задержкой
+    - остальные 4xx (например, 404 у снятой вакансии) сразу поднимают HHAPIError
+    - с cache (HTTPCache) ответы cacheable_endpoints сохраняются на диск, повторные запросы идут
+    с If-None-Match/If-Modified-Since, а 304 отдаётся из локальной копии (cache_path=None -- без кэша).
+    В offline остальные эндпоинты недоступны: чтобы воспроизвести запуск целиком,
+    его нужно записать с cacheable_endpoints, включающими search
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        budgets: dict = DEFAULT_BUDGETS,
+        max_retries: int = MAX_RETRIES,
+        cache_path: str = None,
+        cache_max_size: int = None,
+        offline: bool = False,
+        limit_per_host: int = LIMIT_PER_HOST,
+        cacheable_endpoints: tuple[str, ...] = CACHEABLE_ENDPOINTS,
+    ):
+        self.base_url = base_url
+        self.buckets = {
+            endpoint: TokenBucket(rate) for endpoint, rate in budgets.items()
+        }
+        self.max_retries = max_retries
+        self.cache_path = cache_path
+        self.cache_max_size = cache_max_size
+        self.offline = offline
+        self.limit_per_host = limit_per_host
+        self.cacheable_endpoints = cacheable_endpoints
+
+        self.session: aiohttp.ClientSession = None
+        self.cache: HTTPCache = None
+
+    async def start(self):
+        if self.session and not self.session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        self.session = aiohttp.ClientSession(
+            self.base_url,
+            connector=connector,
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+
+        if self.cache_path:
+            cache_options = (
+                {"max_size": self.cache_max_size} if self.cache_max_size else {}
+            )
+            self.cache = HTTPCache(
+                self.cache_path, offline=self.offline, **cache_options
+            )
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+        if self.cache:
+            self.cache.close()
+            self.cache = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def get_json(self, path: str, endpoint: str, params: dict = None) -> dict:
+        bucket: TokenBucket = self.buckets[endpoint]
+        status, message = None, ""
+
+        cache: HTTPCache or None = (
+            self.cache if endpoint in self.cacheable_endpoints else None
+        )
+
+        cache_key, cached, headers = None, None, {}
+        if self.cache and self.cache.offline and not cache:
+            raise HHAPIError(path, None, "эндпоинт не кэшируется, а кэш офлайн")
+
+        if cache:
+            cache_key = cache.make_key(path, params)
+            cached: CachedResponse or None = cache.get(cache_key)
+
+            if cache.offline:
+                if not cached:
+                    raise HHAPIError(path, None, "нет в офлайн-кэше")
+                return json_loads(cached.body)
+
+            if cached and cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached and cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            retry_after = None
+
+            try:
+                async with self.session.get(
+                    path, params=params, headers=headers
+                ) as resp:
+                    status = resp.status
+
+                    if status == 304 and cached:
+                        bucket.succeed()
+                        return json_loads(cached.body)
+
+                    if status < 400:
+                        bucket.succeed()
+                        body = await resp.read()
+
+                        if cache:
+                            cache.put(
+                                cache_key,
+                                body,
+                                etag=resp.headers.get("ETag"),
+                                last_modified=resp.headers.get("Last-Modified"),
+                            )
+
+                        return json_loads(body)
+
+                    message = await resp.text()
+
+                    if status == 429:
+                        retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                        bucket.throttle(retry_after)
+
+                    elif status < 500:
+                        raise HHAPIError(path, status, message)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, message = None, repr(e)
+
+            if attempt == self.max_retries:
+                break
+
+            delay = max(retry_after or 0.0, backoff_delay(attempt))
+            logger.warning(
+                "hh.ru %s -> %s, повтор через %.1f с", path, status or message, delay
+            )
+            await asyncio.sleep(delay)
+
+        raise HHAPIError(path, status, message)
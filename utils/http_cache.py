@@ -0,0 +1,133 @@
+import sqlite3
+import time
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+# сколько отметок о чтении копится в памяти до записи в SQLite
+ACCESS_FLUSH_SIZE = 500
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str or None
+    last_modified: str or None
+
+
+class HTTPCache:
+    """Персистентный (SQLite) кэш ответов api.hh.ru для HHClient:
+    - хранит тело ответа вместе с ETag/Last-Modified, чтобы HHClient мог слать условные запросы
+    и на 304 отдавать локальную копию
+    - суммарный размер тел ограничен max_size байт, при переполнении вытесняются давно не читанные (LRU)
+    - при offline=True HHClient вообще не ходит в сеть и отдаёт только то, что есть в кэше,
+    так можно воспроизвести прошлый запуск без доступа к hh.ru
+
+    Запросы к SQLite синхронные: база локальная, в режиме WAL они занимают доли миллисекунды.
+    Чтение (get) в базу не пишет: время последнего чтения копится в памяти и записывается
+    одной транзакцией раз в ACCESS_FLUSH_SIZE чтений, перед вытеснением и при закрытии
+    """
+
+    def __init__(
+        self, path: str, max_size: int = 200 * 1024 * 1024, offline: bool = False
+    ):
+        self.max_size = max_size
+        self.offline = offline
+        self._accessed: dict[
+            str, float
+        ] = {}  # key -> время последнего чтения, ещё не записанное
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self.connection.commit()
+
+        self.size: int = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(path: str, params: dict = None) -> str:
+        if not params:
+            return path
+
+        return f"{path}?{urlencode(sorted(params.items()), doseq=True)}"
+
+    def get(self, key: str) -> CachedResponse or None:
+        row = self.connection.execute(
+            "SELECT body, etag, last_modified FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+
+        if not row:
+            return None
+
+        self._accessed[key] = time.time()
+        if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+            self.flush_accessed()
+            self.connection.commit()
+
+        return CachedResponse(*row)
+
+    def flush_accessed(self):
+        """Записывает накопленные времена чтения (без commit)"""
+        if not self._accessed:
+            return
+
+        self.connection.executemany(
+            "UPDATE responses SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+        )
+        self._accessed.clear()
+
+    def put(self, key: str, body: bytes, etag: str = None, last_modified: str = None):
+        # put сам ставит ключу свежее accessed_at
+        self._accessed.pop(key, None)
+
+        previous = self.connection.execute(
+            "SELECT size FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, body, etag, last_modified, len(body), time.time()),
+        )
+        self.size += len(body) - (previous[0] if previous else 0)
+
+        if self.size > self.max_size:
+            self.evict()
+
+        self.connection.commit()
+
+    def evict(self):
+        """Удаляет давно не читанные ответы, пока кэш не ужмётся до 90% от max_size,
+        чтобы не вытеснять по одной записи на каждый новый ответ"""
+        self.flush_accessed()
+        self.connection.execute(
+            """DELETE FROM responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS kept_size
+                    FROM responses
+                )
+                WHERE kept_size > ?
+            )""",
+            (int(self.max_size * 0.9),),
+        )
+        self.size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def close(self):
+        self.flush_accessed()
+        self.connection.commit()
+        self.connection.close()
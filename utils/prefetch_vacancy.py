@@ -1,5 +1,5 @@
 from db import Vacancy, get_vacancy_by_id, get_employers_types
-from utils.regex import parse_tags
+from utils.tagger import tag_vacancy
 import re
 
 
@@ -47,7 +47,7 @@ class VacancyWithValidation:
         name: str = name
         employer_name: str = employer_name
         description: str = description
-        tags: list = parse_tags(description=description)
+        tags: list = list(tag_vacancy(description).tags)
         self.validate_tags(tags)
         from_admin: bool = from_admin
 
@@ -1,4 +1,5 @@
 import re
+from typing import Iterable, NamedTuple
 
 EMPLOYER_TYPE_REGEX = r"Консалт|Юридическ.{1,3}фирм|Юридическ.{1,3}компан|\
     |Юридич.{1,3}услуг|Адвокат"
@@ -114,39 +115,113 @@ LABOUR_TAGS_REGEX = []  # добавить при необходимости
 BANKING_TAGS_REGEX = []  # добавить при необходимости
 
 
-def parse_tags(description: str, found_tags: list = []) -> list or None:
-    pattern = r"|".join(
-        [
-            CORPORATE_TAGS_REGEX,
-            IP_TAGS_REGEX,
-            DP_TAGS_REGEX,
-            DR_TAGS_REGEX,
-            CIVIL_TAGS_REGEX,
-        ]
-    )
+# Категории в порядке вывода: (имя группы в TAGS_PATTERN, название отрасли, регулярное выражение)
+TAG_CATEGORIES = [
+    ("corporate", "Корпоративное право", CORPORATE_TAGS_REGEX),
+    ("ip", "Интеллектуальная собственность", IP_TAGS_REGEX),
+    ("dp", "Персональные данные", DP_TAGS_REGEX),
+    ("dr", "Разрешение споров", DR_TAGS_REGEX),
+    ("civil", "Гражданское право", CIVIL_TAGS_REGEX),
+]
+
+TAG_NAMES = {group: tag_name for group, tag_name, _ in TAG_CATEGORIES}
 
-    found_tags.extend(
-        re.findall(pattern=pattern, string=description, flags=re.I | re.M | re.S)
+
+def lower_regex(regex: str) -> str:
+    """Переводит в нижний регистр всё, кроме escape-последовательностей (\\s и \\S -- разные классы)"""
+    return re.sub(
+        r"\\.|[^\\]+",
+        lambda part: part.group()
+        if part.group().startswith("\\")
+        else part.group().lower(),
+        regex,
     )
 
-    found_tags_as_str = " ".join(found_tags)
 
-    parsed_tags = []
+# Все категории одним выражением, компилируется один раз при импорте:
+# у каждой категории своя именованная группа, поэтому match.lastgroup сразу говорит, к какой отрасли относится совпадение.
+# Текст один раз переводится в нижний регистр, а выражение собрано без re.I -- так поиск примерно втрое быстрее
+TAGS_PATTERN = re.compile(
+    r"|".join(
+        f"(?P<{group}>{lower_regex(regex)})" for group, _, regex in TAG_CATEGORIES
+    ),
+    re.M | re.S,
+)
+
+# для редких текстов, у которых lower() меняет длину (и позиции совпадений разъехались бы)
+TAGS_PATTERN_IGNORECASE = re.compile(
+    r"|".join(f"(?P<{group}>{regex})" for group, _, regex in TAG_CATEGORIES),
+    re.I | re.M | re.S,
+)
+
+# Каждая категория отдельным выражением -- для key_skills: в альтернации TAGS_PATTERN совпадение достаётся
+# только первой категории, а навык вроде "Кредиторская задолженность" относится сразу к нескольким
+TAG_CATEGORY_PATTERNS = [
+    (tag_name, re.compile(regex, re.I | re.M | re.S))
+    for _, tag_name, regex in TAG_CATEGORIES
+]
+
+EMPLOYER_TYPE_PATTERN = re.compile(EMPLOYER_TYPE_REGEX, re.I | re.M | re.S)
 
-    if re.search(CORPORATE_TAGS_REGEX, found_tags_as_str, re.I | re.M | re.S):
-        parsed_tags.append("Корпоративное право")
 
-    if re.search(IP_TAGS_REGEX, found_tags_as_str, re.I | re.M | re.S):
-        parsed_tags.append("Интеллектуальная собственность")
+class TagMatch(NamedTuple):
+    tag_name: str
+    start: int
+    end: int
 
-    if re.search(DP_TAGS_REGEX, found_tags_as_str, re.I | re.M | re.S):
-        parsed_tags.append("Персональные данные")
 
-    if re.search(DR_TAGS_REGEX, found_tags_as_str, re.I | re.M | re.S):
-        parsed_tags.append("Разрешение споров")
+class TagResult(NamedTuple):
+    """Результат разметки вакансии:
+    - tags: отрасли в порядке TAG_CATEGORIES (пустой кортеж, если ничего не нашлось)
+    - matches: совпадения в описании (позиции -- в переданной строке description)
+    """
+
+    tags: tuple[str, ...]
+    matches: tuple[TagMatch, ...]
+
+
+def find_tag_matches(text: str) -> list[TagMatch]:
+    """Все совпадения с отраслевыми выражениями за один проход по тексту"""
+    lowered_text = text.lower()
+
+    if len(lowered_text) == len(text):
+        matches = TAGS_PATTERN.finditer(lowered_text)
+    else:
+        matches = TAGS_PATTERN_IGNORECASE.finditer(text)
 
-    if re.search(CIVIL_TAGS_REGEX, found_tags_as_str, re.I | re.M | re.S):
-        parsed_tags.append("Гражданское право")
+    return [
+        TagMatch(TAG_NAMES[match.lastgroup], match.start(), match.end())
+        for match in matches
+    ]
+
+
+def order_tags(tag_names: set[str]) -> list[str]:
+    """Отрасли в порядке TAG_CATEGORIES"""
+    return [tag_name for _, tag_name, _ in TAG_CATEGORIES if tag_name in tag_names]
+
+
+def find_tags(text: str) -> list[str]:
+    """Отрасли, упомянутые в тексте, в порядке TAG_CATEGORIES"""
+    return order_tags({match.tag_name for match in find_tag_matches(text)})
+
+
+def find_key_skill_tags(key_skills: Iterable[str]) -> list[str]:
+    """Отрасли, к которым относятся key_skills, в порядке TAG_CATEGORIES.
+    Как и в исходном parse_tags, каждая категория ищется по key_skills отдельно,
+    поэтому один навык может дать несколько отраслей"""
+    text = " ".join(key_skills)
+
+    return [
+        tag_name for tag_name, pattern in TAG_CATEGORY_PATTERNS if pattern.search(text)
+    ]
+
+
+def parse_tags(description: str, found_tags: list = None) -> list or None:
+    """Старый интерфейс разметки: found_tags -- дополнительные строки для поиска (например, key_skills).
+    В новом коде лучше использовать utils.tagger.tag_vacancy"""
+    parsed_tags = order_tags(
+        set(find_tags(description)) | set(find_key_skill_tags(found_tags or []))
+    )
 
     if not parsed_tags:
         return None
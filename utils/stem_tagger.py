@@ -0,0 +1,360 @@
+"""Разметка вакансий по словарю основ (utils/data/tag_stems.txt) автоматом Ахо-Корасик.
+
+Все основы всех отраслей собраны в один автомат, поэтому описание просматривается за один проход
+и время разметки растёт с длиной текста, а не с размером словаря: в категорию можно добавлять
+сотни основ без замедления. Результат -- тот же TagResult, что и у utils.tagger.tag_vacancy (backend="stems").
+"""
+
+from collections import deque
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from utils.regex import TAG_CATEGORIES, TagMatch, TagResult, order_tags
+
+try:
+    import ahocorasick  # pyahocorasick: тот же автомат, но на C
+except ImportError:
+    ahocorasick = None
+
+TAG_STEMS_PATH = Path(__file__).parent / "data" / "tag_stems.txt"
+
+# сколько любых символов допускается между соседними основами фразы по умолчанию
+DEFAULT_GAP = 4
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр с сохранением длины строки (позиции совпадений не должны разъезжаться).
+    ё в е не переводится: регулярные выражения utils.regex их тоже различают"""
+    normalized = text.lower()
+
+    if len(normalized) != len(text):
+        normalized = "".join(char.lower()[0] for char in text)
+
+    return normalized
+
+
+def is_separator(char: str) -> bool:
+    """Символ из [\\s,] -- разделитель, которым в utils.regex окружены короткие основы вроде СД и АО"""
+    return char == "," or char.isspace()
+
+
+class Stem(NamedTuple):
+    text: str
+    gap: int  # сколько символов допускается между предыдущей основой фразы и этой
+    min_gap: int  # и сколько их там должно быть как минимум
+    separated_before: bool  # перед основой [\s,]+, и разделители входят в совпадение
+    separated_after: bool  # после основы [\s,]+, и разделители входят в совпадение
+
+
+class Phrase(NamedTuple):
+    tag_name: str
+    stems: tuple[Stem, ...]
+    tail: int = 0  # сколько символов после последней основы входит в совпадение (как .{0,N} в конце выражения)
+
+    @property
+    def window(self) -> int:
+        """Насколько далеко назад от конца основы может закончиться предыдущая основа фразы"""
+        return max(stem.gap + len(stem.text) for stem in self.stems)
+
+
+def parse_gap(token: str) -> tuple[int, int]:
+    """~N -- от 0 до N символов, ~M-N -- от M до N"""
+    min_gap, _, gap = token[1:].rpartition("-")
+    return int(min_gap or 0), int(gap)
+
+
+def expand_char_class(token: str) -> list[str]:
+    """[абв]основа -> [аоснова, боснова, воснова]: символьный класс перед основой, как в utils.regex"""
+    if not token.startswith("["):
+        return [token]
+
+    chars, bracket, rest = token[1:].partition("]")
+    if not bracket or not chars or not rest:
+        raise ValueError(f"Неверный символьный класс в словаре: {token!r}")
+
+    return [char + rest for char in dict.fromkeys(normalize(chars))]
+
+
+def parse_phrase(tag_name: str, line: str) -> list[Phrase]:
+    """Фраза из строки словаря; символьный класс разворачивается в несколько фраз"""
+    tokens = line.split()
+    variants: list[list[Stem]] = [[]]
+    min_gap, gap = 0, DEFAULT_GAP
+
+    for token in tokens:
+        if token.startswith("~"):
+            min_gap, gap = parse_gap(token)
+            continue
+
+        separated_before, separated_after = token.startswith("_"), token.endswith("_")
+        stems = []
+
+        for text in expand_char_class(token.strip("_")):
+            text = normalize(text)
+            if not text:
+                raise ValueError(f"Пустая основа в строке словаря: {line!r}")
+
+            stems.append(
+                Stem(
+                    text=text,
+                    gap=gap,
+                    min_gap=min_gap,
+                    separated_before=separated_before,
+                    separated_after=separated_after,
+                )
+            )
+
+        variants = [variant + [stem] for variant in variants for stem in stems]
+        min_gap, gap = 0, DEFAULT_GAP
+
+    # ~N в конце строки -- хвост совпадения, а не зазор перед следующей основой
+    tail = gap if tokens[-1].startswith("~") else 0
+
+    phrases = [
+        Phrase(tag_name=tag_name, stems=tuple(stems), tail=tail) for stems in variants
+    ]
+
+    # окно незавершённых фраз в StemTagger рассчитано на основы фиксированной длины,
+    # поэтому разделители допускаются только по краям фразы
+    for stem in phrases[0].stems[1:]:
+        if stem.separated_before:
+            raise ValueError(f"_ допускается только перед первой основой: {line!r}")
+    for stem in phrases[0].stems[:-1]:
+        if stem.separated_after:
+            raise ValueError(f"_ допускается только после последней основы: {line!r}")
+
+    return phrases
+
+
+def load_phrases(path: Path = TAG_STEMS_PATH) -> list[Phrase]:
+    known_tag_names = {tag_name for _, tag_name, _ in TAG_CATEGORIES}
+    phrases, tag_name = [], None
+
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+
+            if line.startswith("[") and line.endswith("]"):
+                tag_name = line[1:-1].strip()
+                if tag_name not in known_tag_names:
+                    raise ValueError(f"Неизвестная отрасль в словаре: {tag_name}")
+                continue
+
+            if not tag_name:
+                raise ValueError(f"Основа вне категории: {line!r}")
+
+            phrases.extend(parse_phrase(tag_name, line))
+
+    return phrases
+
+
+class StemTagger:
+    """Автомат Ахо-Корасик над основами всех фраз словаря:
+    - один проход по нормализованному тексту находит все вхождения всех основ
+    - фраза из нескольких основ засчитывается, если каждая следующая основа начинается
+    не дальше чем через gap (и не ближе чем через min_gap) символов после конца предыдущей
+    - из пересекающихся совпадений остаются те же, что оставила бы альтернация регулярного выражения:
+    раньше начавшееся, а при равном начале -- фраза, стоящая в словаре выше
+    - разделители [\\s,]+, символьные классы и ё/е -- как в utils.regex, так что разметка
+    совпадает с parse_tags до позиций совпадений (tests/test_tagging.py)
+    """
+
+    def __init__(self, phrases: list[Phrase]):
+        self.phrases = phrases
+
+        self.windows: list[int] = [phrase.window for phrase in phrases]
+
+        # основа -> [(номер фразы, номер основы во фразе)]
+        self.stem_ids: dict[str, int] = {}
+        self.stem_uses: list[list[tuple[int, int]]] = []
+
+        for phrase_id, phrase in enumerate(phrases):
+            for position, stem in enumerate(phrase.stems):
+                if stem.text not in self.stem_ids:
+                    self.stem_ids[stem.text] = len(self.stem_uses)
+                    self.stem_uses.append([])
+                self.stem_uses[self.stem_ids[stem.text]].append((phrase_id, position))
+
+        self.build_automaton()
+
+        self.c_automaton = None
+        if ahocorasick:
+            self.c_automaton = ahocorasick.Automaton()
+            for stem_text, stem_id in self.stem_ids.items():
+                self.c_automaton.add_word(stem_text, (stem_id, len(stem_text)))
+            self.c_automaton.make_automaton()
+
+    @classmethod
+    def from_file(cls, path: Path = TAG_STEMS_PATH) -> "StemTagger":
+        return cls(load_phrases(path))
+
+    def build_automaton(self):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        # состояние -> [(id основы, длина основы)], включая основы из цепочки fail-ссылок
+        self.output: list[list[tuple[int, int]]] = [[]]
+
+        for stem_text, stem_id in self.stem_ids.items():
+            state = 0
+            for char in stem_text:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append((stem_id, len(stem_text)))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fail_state = self.fail[state]
+                while fail_state and char not in self.goto[fail_state]:
+                    fail_state = self.fail[fail_state]
+                self.fail[next_state] = self.goto[fail_state].get(char, 0)
+                self.output[next_state] = (
+                    self.output[next_state] + self.output[self.fail[next_state]]
+                )
+
+    def find_stems(self, text: str) -> list[tuple[int, int, int]]:
+        """(id основы, начало, конец) всех вхождений основ в порядке возрастания конца"""
+        if self.c_automaton:
+            return [
+                (stem_id, index + 1 - length, index + 1)
+                for index, (stem_id, length) in self.c_automaton.iter(text)
+            ]
+
+        goto, fail, output = self.goto, self.fail, self.output
+        root: dict[str, int] = goto[0]
+        state, found = 0, []
+
+        for index, char in enumerate(text):
+            # большинство символов не продолжают ни одну основу: из корня переходим без цепочки fail-ссылок
+            if not state:
+                state = root.get(char, 0)
+            else:
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+
+            if output[state]:
+                for stem_id, length in output[state]:
+                    found.append((stem_id, index + 1 - length, index + 1))
+
+        return found
+
+    @staticmethod
+    def separators_before(text: str, start: int) -> int:
+        """Начало [\\s,]+ перед start (start, если разделителей нет)"""
+        while start and is_separator(text[start - 1]):
+            start -= 1
+        return start
+
+    @staticmethod
+    def separators_after(text: str, end: int) -> int:
+        """Конец [\\s,]+ после end (end, если разделителей нет)"""
+        while end < len(text) and is_separator(text[end]):
+            end += 1
+        return end
+
+    def find_candidates(self, text: str) -> list[tuple[int, int, int]]:
+        """Все совпадения фраз: (начало, номер фразы, конец)"""
+        # (номер фразы, номер основы) -> [(начало фразы, конец основы)] -- незавершённые фразы
+        partials: dict[tuple[int, int], list[tuple[int, int]]] = {}
+        candidates = []
+
+        for stem_id, stem_start, stem_end in self.find_stems(text):
+            for phrase_id, position in self.stem_uses[stem_id]:
+                phrase: Phrase = self.phrases[phrase_id]
+                stem: Stem = phrase.stems[position]
+                start, end = stem_start, stem_end
+
+                if stem.separated_before:
+                    start = self.separators_before(text, start)
+                    if start == stem_start:
+                        continue
+                if stem.separated_after:
+                    end = self.separators_after(text, end)
+                    if end == stem_end:
+                        continue
+
+                if position == 0:
+                    phrase_starts = (start,)
+                else:
+                    # одна и та же основа может продолжать фразы, начатые в разных местах
+                    phrase_starts = [
+                        previous_start
+                        for previous_start, previous_end in partials.get(
+                            (phrase_id, position - 1), []
+                        )
+                        if stem.min_gap <= start - previous_end <= stem.gap
+                    ]
+
+                if position == len(phrase.stems) - 1:
+                    for phrase_start in phrase_starts:
+                        candidates.append((phrase_start, phrase_id, end))
+                elif phrase_starts:
+                    progress = partials.setdefault((phrase_id, position), [])
+                    for phrase_start in phrase_starts:
+                        progress.append((phrase_start, end))
+                    # слишком давние незавершённые фразы уже ничем не продолжатся
+                    while progress and end - progress[0][1] > self.windows[phrase_id]:
+                        progress.pop(0)
+
+        return candidates
+
+    def find_tag_matches(self, text: str) -> list[TagMatch]:
+        normalized_text = normalize(text)
+        matches, last_end = [], 0
+
+        # как у регулярного выражения: самое левое совпадение, при равном начале -- фраза выше в словаре
+        # и самое длинное из её вариантов (.{0,N} жадный), следующее совпадение ищется после конца предыдущего
+        for start, phrase_id, end in sorted(
+            self.find_candidates(normalized_text),
+            key=lambda candidate: (candidate[0], candidate[1], -candidate[2]),
+        ):
+            phrase: Phrase = self.phrases[phrase_id]
+
+            if start < last_end:
+                # [\s,]+ в начале выражения: совпадение начинается с того разделителя,
+                # что остался после предыдущего совпадения, если остался хоть один
+                if not (
+                    phrase.stems[0].separated_before
+                    and last_end < self.separators_after(normalized_text, start)
+                ):
+                    continue
+                start = last_end
+
+            end = min(len(text), end + phrase.tail)
+
+            matches.append(TagMatch(phrase.tag_name, start, end))
+            last_end = end
+
+        return matches
+
+    def find_key_skill_tags(self, key_skills: Iterable[str]) -> set[str]:
+        """Как utils.regex.find_key_skill_tags: в key_skills засчитываются все найденные фразы,
+        а не только непересекающиеся, так что один навык может дать несколько отраслей
+        """
+        return {
+            self.phrases[phrase_id].tag_name
+            for _, phrase_id, _ in self.find_candidates(normalize(" ".join(key_skills)))
+        }
+
+    def tag(self, description: str, key_skills: Iterable[str] = ()) -> TagResult:
+        matches: list[TagMatch] = self.find_tag_matches(description)
+
+        found_tag_names = {match.tag_name for match in matches}
+        found_tag_names.update(self.find_key_skill_tags(key_skills))
+
+        return TagResult(
+            tags=tuple(order_tags(found_tag_names)), matches=tuple(matches)
+        )
+
+
+stem_tagger = StemTagger.from_file()
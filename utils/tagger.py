@@ -0,0 +1,31 @@
+from typing import Iterable
+
+from utils.regex import (
+    TagMatch,
+    TagResult,
+    find_key_skill_tags,
+    find_tag_matches,
+    order_tags,
+)
+from utils.stem_tagger import stem_tagger
+
+# "regex" -- utils.regex.TAGS_PATTERN, "stems" -- словарь основ utils/data/tag_stems.txt (utils.stem_tagger)
+TAGGER_BACKEND = "regex"
+
+
+def tag_vacancy(
+    description: str, key_skills: Iterable[str] = (), backend: str = None
+) -> TagResult:
+    """Размечает вакансию по отраслям права по описанию и key_skills.
+    Ничего не хранит между вызовами и не меняет аргументы, поэтому её можно звать
+    из любого числа конкурентных задач или процессов"""
+    if (backend or TAGGER_BACKEND) == "stems":
+        return stem_tagger.tag(description, key_skills)
+
+    matches: list[TagMatch] = find_tag_matches(description)
+
+    found_tag_names = {match.tag_name for match in matches}
+    # каждая категория по key_skills ищется отдельно: один навык может дать несколько отраслей
+    found_tag_names.update(find_key_skill_tags(key_skills))
+
+    return TagResult(tags=tuple(order_tags(found_tag_names)), matches=tuple(matches))
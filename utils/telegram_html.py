@@ -0,0 +1,284 @@
+"""Перевод HTML-описаний вакансий hh.ru в то подмножество HTML, которое понимает Telegram (parse_mode=HTML).
+
+Описание разбирается за один проход одним скомпилированным выражением (TOKEN_PATTERN): поддерживаемые Telegram теги переводятся в его теги,
+блоки (абзацы, списки, заголовки) -- в переносы строк, остальная разметка выбрасывается,
+а текст экранируется. Открытые теги всегда закрываются в правильном порядке, поэтому результат
+принимается Telegram с первой попытки, в том числе обрезанный по max_length.
+"""
+
+import html
+import re
+
+# тег hh.ru -> тег Telegram
+INLINE_TAGS = {
+    "b": "b",
+    "strong": "b",
+    "i": "i",
+    "em": "i",
+    "u": "u",
+    "ins": "u",
+    "s": "s",
+    "strike": "s",
+    "del": "s",
+    "code": "code",
+    "pre": "pre",
+    "a": "a",
+}
+
+# сколько переносов строки ставится перед блоком (и после него)
+BLOCK_TAGS = {
+    "p": 2,
+    "div": 1,
+    "h1": 2,
+    "h2": 2,
+    "h3": 2,
+    "h4": 2,
+    "h5": 2,
+    "h6": 2,
+    "ul": 1,
+    "ol": 1,
+    "li": 1,
+    "tr": 1,
+    "blockquote": 2,
+    "pre": 1,
+}
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+# содержимое этих тегов не показывается
+SKIPPED_TAGS = {"script", "style", "head", "title"}
+
+# внутри code и pre Telegram не разрешает другую разметку
+PLAIN_TEXT_TAGS = {"code", "pre"}
+
+LINK_SCHEMES = ("http://", "https://", "tg://", "mailto:")
+
+BULLET = "   • "
+ELLIPSIS = " ..."
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# комментарий | тег (closing, name, attrs) | текст | одиночный "<", который не открывает тег
+TOKEN_PATTERN = re.compile(
+    r"<!--.*?(?:-->|$)"
+    r"|<(/?)([a-zA-Z][a-zA-Z0-9-]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>"
+    r"|[^<]+"
+    r"|<",
+    re.S,
+)
+
+HREF_PATTERN = re.compile(r"""href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I)
+
+
+class TelegramHTMLRenderer:
+    """- max_length: сколько видимых символов (без разметки) оставить, дальше описание обрезается с " ..."
+    - keep_whitespace: переносы и пробелы в тексте остаются как есть (для уже отрендеренных описаний
+    и описаний, набранных админом), иначе, как в браузере, схлопываются в один пробел
+    """
+
+    def __init__(self, max_length: int = None, keep_whitespace: bool = False):
+        self.max_length = max_length
+        self.keep_whitespace = keep_whitespace
+
+        self.parts: list[str] = []
+        self.length = 0  # видимых символов в parts
+        self.truncated = False
+
+        # (тег hh.ru, тег Telegram или None, если он не выводился)
+        self.open_tags: list[tuple[str, str or None]] = []
+        self.lists: list[list] = []  # [тег списка, номер текущего пункта]
+        self.skipped_depth = 0
+        self.pre_depth = 0  # внутри <pre> пробелы и переносы не схлопываются
+
+        self.pending_newlines = 0
+        self.line_prefix = ""
+        self.at_line_start = True
+
+    @property
+    def emitted_tags(self) -> list[str]:
+        return [tg_tag for _, tg_tag in self.open_tags if tg_tag]
+
+    def block(self, newlines: int):
+        # с keep_whitespace переносы уже есть в самом тексте
+        if self.parts and not self.keep_whitespace:
+            self.pending_newlines = max(self.pending_newlines, newlines)
+
+    def write_markup(self, markup: str):
+        self.parts.append(markup)
+
+    def write_visible(self, text: str):
+        """Экранирует и дописывает видимый текст, следя за max_length"""
+        if self.max_length is not None and self.length + len(text) > self.max_length:
+            text = text[: max(0, self.max_length - self.length)].rstrip() + ELLIPSIS
+            self.truncated = True
+
+        self.parts.append(html.escape(text, quote=False))
+        self.length += len(text)
+
+    def start_line(self):
+        """Отложенные переносы строки и маркер пункта списка пишутся перед первым содержимым блока,
+        поэтому пустые блоки не дают пустых строк, а маркер не попадает внутрь <b>"""
+        prefix = "\n" * self.pending_newlines + self.line_prefix
+        if self.pending_newlines:
+            self.at_line_start = True
+        self.pending_newlines, self.line_prefix = 0, ""
+
+        if prefix:
+            self.write_visible(prefix)
+
+    def write_text(self, text: str, keep_whitespace: bool):
+        line_start = self.at_line_start or self.pending_newlines or not self.length
+        if line_start and not keep_whitespace:
+            text = text.lstrip(" ")
+            if not text:
+                return
+
+        self.start_line()
+        if self.truncated:
+            return
+
+        self.write_visible(text)
+        self.at_line_start = text.endswith("\n")
+
+    def open_tag(self, tag: str, attrs: str):
+        tg_tag = INLINE_TAGS[tag]
+        emitted = self.emitted_tags
+
+        # одинаковые теги друг в друге и разметка внутри code/pre Telegram не нужны
+        if tg_tag in emitted or any(t in PLAIN_TEXT_TAGS for t in emitted):
+            tg_tag = None
+
+        elif tg_tag == "a":
+            href_match = HREF_PATTERN.search(attrs)
+            href = (
+                html.unescape(next(filter(None, href_match.groups()), "")).strip()
+                if href_match
+                else ""
+            )
+            if not href.lower().startswith(LINK_SCHEMES):
+                tg_tag = None
+            else:
+                self.start_line()
+                self.write_markup(f'<a href="{html.escape(href)}">')
+
+        else:
+            self.start_line()
+            self.write_markup(f"<{tg_tag}>")
+            self.pre_depth += tg_tag == "pre"
+
+        self.open_tags.append((tag, tg_tag))
+
+    def close_tag(self, tag: str):
+        if not any(open_tag == tag for open_tag, _ in self.open_tags):
+            return
+
+        # всё, что открыли внутри и не закрыли, закрывается вместе с тегом
+        while self.open_tags:
+            open_tag, tg_tag = self.open_tags.pop()
+            if tg_tag:
+                self.write_markup(f"</{tg_tag}>")
+                self.pre_depth -= tg_tag == "pre"
+            if open_tag == tag:
+                return
+
+    def handle_starttag(self, tag: str, attrs: str):
+        if self.truncated:
+            return
+
+        if tag in SKIPPED_TAGS:
+            self.skipped_depth += 1
+            return
+
+        if tag == "br":
+            self.pending_newlines += 1 if self.parts else 0
+            self.at_line_start = True
+            return
+
+        if tag in BLOCK_TAGS:
+            self.block(BLOCK_TAGS[tag])
+
+        if tag in ("ul", "ol"):
+            self.lists.append([tag, 0])
+        elif tag == "li":
+            if self.lists and self.lists[-1][0] == "ol":
+                self.lists[-1][1] += 1
+                self.line_prefix = f"   {self.lists[-1][1]}. "
+            else:
+                self.line_prefix = BULLET
+
+        if tag in HEADING_TAGS:
+            self.open_tag("b", "")
+            self.open_tags[-1] = (tag, self.open_tags[-1][1])
+        elif tag in INLINE_TAGS:
+            self.open_tag(tag, attrs)
+
+    def handle_endtag(self, tag: str):
+        if self.truncated:
+            return
+
+        if tag in SKIPPED_TAGS:
+            self.skipped_depth = max(0, self.skipped_depth - 1)
+            return
+
+        if tag in INLINE_TAGS or tag in HEADING_TAGS:
+            self.close_tag(tag)
+
+        if tag in ("ul", "ol") and self.lists:
+            self.lists.pop()
+
+        if tag in BLOCK_TAGS:
+            self.block(BLOCK_TAGS[tag])
+
+    def handle_data(self, data: str):
+        if self.truncated or self.skipped_depth:
+            return
+
+        keep_whitespace = self.keep_whitespace or self.pre_depth
+        if not keep_whitespace:
+            # пробелы между тегами -- самый частый кусок текста в описаниях hh.ru
+            data = " " if data.isspace() else WHITESPACE_PATTERN.sub(" ", data)
+
+        if data:
+            self.write_text(data, keep_whitespace)
+
+    def render(self, text: str) -> str:
+        for token in TOKEN_PATTERN.finditer(text):
+            if self.truncated:
+                break
+
+            closing, tag, attrs = token.groups()
+
+            if tag:
+                tag = tag.lower()
+                if closing:
+                    self.handle_endtag(tag)
+                else:
+                    self.handle_starttag(tag, attrs)
+                    # <b/> и т.п.: void-теги вроде <br/> закрывать нечего, handle_endtag их пропустит
+                    if attrs.endswith("/"):
+                        self.handle_endtag(tag)
+
+            else:
+                data = token.group()
+                if data.startswith("<!--"):
+                    continue
+                self.handle_data(html.unescape(data) if "&" in data else data)
+
+        for _, tg_tag in reversed(self.open_tags):
+            if tg_tag:
+                self.write_markup(f"</{tg_tag}>")
+        self.open_tags = []
+
+        return "".join(self.parts).rstrip()
+
+
+def render_description(
+    description: str or None, max_length: int = None, keep_whitespace: bool = False
+) -> str or None:
+    """HTML-описание вакансии -> текст для parse_mode=HTML. Повторный рендер с keep_whitespace=True
+    ничего не меняет, так что им же можно безопасно обрезать уже отрендеренное описание
+    """
+    if description is None:
+        return None
+
+    return TelegramHTMLRenderer(max_length, keep_whitespace).render(description)
@@ -0,0 +1,218 @@
+"""CPU-bound обработка текстов вакансий: рендер описания для Telegram, разметка по отраслям и проверка работодателя.
+
+На больших выдачах (тысячи описаний) рендер и разметка заметно занимают event loop, и бот перестаёт
+отвечать на сообщения и колбэки, пока идёт парсинг. TextPool выносит их в отдельные процессы
+пачками. Воркеры запускаются через spawn и при старте заново импортируют __main__ бота (main.py):
+поэтому в main.py на уровне модуля ничего не выполняется, и воркер импортирует только этот модуль
+с utils.regex, utils.tagger и utils.telegram_html, без aiogram, db и бота. Модуль не должен
+импортировать ни aiogram, ни db.
+Проверка одного описания работодателя (is_consulting) -- один поиск по регулярке, её дешевле сделать
+на месте, чем пересылать в воркер.
+"""
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Iterable, NamedTuple
+
+from utils.regex import EMPLOYER_TYPE_PATTERN
+from utils.tagger import tag_vacancy
+from utils.telegram_html import render_description
+
+# воркеров в пуле: одно ядро остаётся event loop'у бота
+TEXT_POOL_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# сколько вакансий уходит в воркер одной задачей: меньше -- дороже пересылка, больше -- хуже делится между воркерами
+TEXT_BATCH_SIZE = 25
+
+# сколько обработанных текстов помнит TextCache (описание -- несколько КБ, так что это десятки МБ)
+TEXT_CACHE_SIZE = 10_000
+
+
+class VacancyText(NamedTuple):
+    description: str or None  # описание с hh.ru как есть (HTML)
+    key_skills: tuple[str, ...] = ()
+
+
+class ProcessedText(NamedTuple):
+    description: str or None  # описание после render_description
+    tags: tuple[str, ...]
+
+
+def is_consulting(employer_description: str or None) -> bool:
+    """Похоже ли описание работодателя с hh.ru на описание консалтинга (EMPLOYER_TYPE_REGEX)"""
+    return bool(
+        employer_description and EMPLOYER_TYPE_PATTERN.search(employer_description)
+    )
+
+
+def process_vacancy_text(vacancy_text: VacancyText) -> ProcessedText:
+    description = render_description(vacancy_text.description)
+
+    # вакансии без описания не размечаются
+    if not description:
+        return ProcessedText(description=description, tags=())
+
+    tags = tag_vacancy(description, key_skills=vacancy_text.key_skills).tags
+
+    return ProcessedText(description=description, tags=tags)
+
+
+def process_batch(vacancy_texts: list[VacancyText]) -> list[ProcessedText]:
+    return [process_vacancy_text(vacancy_text) for vacancy_text in vacancy_texts]
+
+
+def init_worker():
+    """Выражения компилируются при импорте utils.regex и utils.stem_tagger -- прогреваем их
+    и рендер описаний один раз при старте воркера, а не на первой пачке"""
+    process_vacancy_text(VacancyText("<p>Требования</p>", ("Юрист",)))
+
+
+class TextCache:
+    """LRU обработанных текстов: одни и те же описания приходят снова и снова
+    (перепосты, одинаковые вакансии одного работодателя, повторные запуски по известным вакансиям).
+    Ключ -- хэш сырого описания вместе с key_skills, поэтому хранить сами тексты ради ключа не нужно.
+    hits/misses считаются с запуска процесса
+    """
+
+    def __init__(self, max_size: int = TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self._items: OrderedDict[bytes, ProcessedText] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(vacancy_text: VacancyText) -> bytes:
+        key = hashlib.blake2b(digest_size=16)
+
+        # None и пустое описание обрабатываются по-разному, поэтому и ключи у них разные
+        if vacancy_text.description is None:
+            key.update(b"\x00")
+        else:
+            key.update(b"\x01" + vacancy_text.description.encode())
+
+        for key_skill in vacancy_text.key_skills:
+            key.update(b"\x00" + key_skill.encode())
+
+        return key.digest()
+
+    def get(self, key: bytes) -> ProcessedText or None:
+        processed_text = self._items.get(key)
+
+        if processed_text is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._items.move_to_end(key)
+        return processed_text
+
+    def put(self, key: bytes, processed_text: ProcessedText):
+        self._items[key] = processed_text
+        self._items.move_to_end(key)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class TextPool:
+    """Пул процессов для process_batch, один на всё приложение:
+    открывается в on_startup (start), закрывается в on_shutdown (close).
+    Пока пул не запущен (скрипты, бенчмарки), пачки обрабатываются прямо в текущем процессе.
+    Результаты process запоминаются в cache (TextCache) в основном процессе,
+    так что в воркеры уходят только тексты, которых ещё не было
+    """
+
+    def __init__(
+        self,
+        max_workers: int = TEXT_POOL_WORKERS,
+        batch_size: int = TEXT_BATCH_SIZE,
+        cache_size: int = TEXT_CACHE_SIZE,
+    ):
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.cache = TextCache(cache_size)
+        self.executor: ProcessPoolExecutor = None
+
+    def start(self):
+        if self.executor:
+            return
+
+        # spawn, а не fork: к этому моменту в процессе бота уже работают потоки (планировщик, пул БД)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=get_context("spawn"),
+            initializer=init_worker,
+        )
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def _map(self, func, items: list) -> list:
+        if not self.executor:
+            return func(items)
+
+        loop = asyncio.get_running_loop()
+        chunks = [
+            items[start : start + self.batch_size]
+            for start in range(0, len(items), self.batch_size)
+        ]
+
+        # asyncio.gather возвращает результаты в порядке переданных пачек
+        results = await asyncio.gather(
+            *[loop.run_in_executor(self.executor, func, chunk) for chunk in chunks]
+        )
+
+        return [item for chunk_result in results for item in chunk_result]
+
+    async def process(
+        self, vacancy_texts: Iterable[VacancyText]
+    ) -> list[ProcessedText]:
+        """Рендерит описания и размечает вакансии, результаты -- в порядке vacancy_texts"""
+        vacancy_texts = list(vacancy_texts)
+        keys = [self.cache.make_key(vacancy_text) for vacancy_text in vacancy_texts]
+
+        results: dict[bytes, ProcessedText] = {}
+        # одинаковые тексты внутри пачки тоже обрабатываются один раз
+        missing: dict[bytes, VacancyText] = {}
+
+        for key, vacancy_text in zip(keys, vacancy_texts):
+            if key in results or key in missing:
+                self.cache.hits += 1
+                continue
+
+            processed_text = self.cache.get(key)
+            if processed_text is None:
+                missing[key] = vacancy_text
+            else:
+                results[key] = processed_text
+
+        if missing:
+            processed_texts = await self._map(process_batch, list(missing.values()))
+
+            for key, processed_text in zip(missing, processed_texts):
+                self.cache.put(key, processed_text)
+                results[key] = processed_text
+
+        return [results[key] for key in keys]
+
+
+text_pool = TextPool()
@@ -0,0 +1,104 @@
+import json
+from collections import OrderedDict
+from typing import NamedTuple
+
+from db import Vacancy, get_vacancy_by_id
+from keyboards import vacancy_kb_hide_desc, vacancy_kb_show_desc
+from utils.general import get_message_text
+
+# сколько вакансий помнит VacancyMessageCache: с запасом на рассылку за сутки
+VACANCY_MESSAGES_CACHE_SIZE = 1000
+
+
+class VacancyMessage(NamedTuple):
+    """Готовое сообщение о вакансии для bot.send_message/edit_message_text (parse_mode=HTML).
+    reply_markup -- клавиатура, уже сериализованная в JSON: строку aiogram передаёт в API как есть
+    """
+
+    text: str
+    reply_markup: str
+
+
+class VacancyMessages(NamedTuple):
+    short: VacancyMessage  # без описания, с кнопкой "Показать описание"
+    # с описанием, с кнопкой "Скрыть описание"; None -- вакансия была прочитана без описания
+    full: VacancyMessage or None
+
+
+def render_short_message(vacancy: Vacancy) -> VacancyMessage:
+    """Не обращается к vacancy.description, так что подходит и для вакансий из iter_unsent_vacancies"""
+    return VacancyMessage(
+        text=get_message_text(vacancy),
+        reply_markup=json.dumps(vacancy_kb_show_desc(vacancy).to_python()),
+    )
+
+
+def render_vacancy_messages(vacancy: Vacancy) -> VacancyMessages:
+    return VacancyMessages(
+        short=render_short_message(vacancy),
+        full=VacancyMessage(
+            text=get_message_text(vacancy, show_desc=True),
+            reply_markup=json.dumps(vacancy_kb_hide_desc(vacancy).to_python()),
+        ),
+    )
+
+
+class VacancyMessageCache:
+    """Сообщения о вакансии одинаковы для всех получателей, поэтому текст и клавиатуры
+    рендерятся один раз на вакансию (по hh_id), а не на каждого пользователя.
+    После рассылки отсюда же берутся сообщения для кнопок "Показать/Скрыть описание",
+    и на каждый клик не нужно заново читать вакансию из БД.
+    Поля вакансии, из которых строятся сообщения, после сохранения не меняются: add_vacancies
+    и Vacancy.add уже сохранённые вакансии не перезаписывают, а complete_vacancies меняет только is_sent,
+    которого в сообщениях нет. Поэтому инвалидировать записи не нужно, но если появится путь,
+    который переписывает сохранённую вакансию, он должен выкидывать её hh_id отсюда
+    """
+
+    def __init__(self, max_size: int = VACANCY_MESSAGES_CACHE_SIZE):
+        self.max_size = max_size
+        self._messages: OrderedDict[int, VacancyMessages] = OrderedDict()
+
+    def _put(self, hh_id: int, messages: VacancyMessages):
+        self._messages[hh_id] = messages
+        self._messages.move_to_end(hh_id)
+
+        while len(self._messages) > self.max_size:
+            self._messages.popitem(last=False)
+
+    def get(self, vacancy: Vacancy) -> VacancyMessages:
+        messages: VacancyMessages or None = self._messages.get(vacancy.hh_id)
+
+        if messages is None or messages.full is None:
+            messages = render_vacancy_messages(vacancy)
+            self._put(vacancy.hh_id, messages)
+        else:
+            self._messages.move_to_end(vacancy.hh_id)
+
+        return messages
+
+    def get_short(self, vacancy: Vacancy) -> VacancyMessage:
+        """Короткое сообщение для рассылки; полное не рендерится, пока его не попросят (get_by_id)"""
+        messages: VacancyMessages or None = self._messages.get(vacancy.hh_id)
+
+        if messages is None:
+            messages = VacancyMessages(short=render_short_message(vacancy), full=None)
+            self._put(vacancy.hh_id, messages)
+        else:
+            self._messages.move_to_end(vacancy.hh_id)
+
+        return messages.short
+
+    async def get_by_id(self, hh_id: int) -> VacancyMessages or None:
+        messages: VacancyMessages or None = self._messages.get(hh_id)
+        if messages is not None and messages.full is not None:
+            self._messages.move_to_end(hh_id)
+            return messages
+
+        vacancy: Vacancy or None = await get_vacancy_by_id(vacancy_id=hh_id)
+        if not vacancy:
+            return None
+
+        return self.get(vacancy)
+
+
+vacancy_messages = VacancyMessageCache()